@@ -0,0 +1,57 @@
+"""
+Масштабирование CPython-хоста по числу процессов.
+
+Генерирует синтетические страницы товаров Ozon и прогоняет их через
+python-host/batch_host.py с 1, 2, 4, ... процессами до числа ядер.
+
+Запуск: python benchmarks/batch_scaling.py [число страниц] [размер страницы, КБ]
+"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'python-host'))
+
+from batch_host import resolve_plugin_path, run_batch  # noqa: E402
+
+SECTION = (
+    '<div id="section-description"><h2>Описание</h2><div>Витамин D3 поддерживает иммунитет '
+    'и здоровье костей. Одна капсула в день.</div></div>'
+    '<div id="section-description"><h2>Состав</h2><div>Холекальциферол, масло оливковое, '
+    'желатин, глицерин.</div></div>'
+)
+
+
+def write_pages(path: str, count: int, page_kb: int):
+    repeats = max(1, page_kb * 1024 // len(SECTION.encode('utf-8')))
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            page_html = f"https://www.ozon.ru/product/{i}/ " + SECTION * repeats
+            f.write(json.dumps({"id": i, "params": {"page_html": page_html}}, ensure_ascii=False) + '\n')
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    page_kb = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    cores = os.cpu_count() or 1
+    worker_counts = sorted({1, cores} | {n for n in (2, 4, 8, 16, 32, 64) if n < cores})
+
+    server_path = resolve_plugin_path('ozon-analyzer')
+    with tempfile.TemporaryDirectory() as tmp:
+        pages_path = os.path.join(tmp, 'pages.jsonl')
+        write_pages(pages_path, count, page_kb)
+        print(f"Страниц: {count} по ~{page_kb} КБ, ядер: {cores}")
+
+        baseline = None
+        for workers in worker_counts:
+            stats = run_batch(server_path, pages_path, io.StringIO(), workers=workers, chunksize=16)
+            baseline = baseline or stats["pages_per_s"]
+            speedup = stats["pages_per_s"] / baseline if baseline else 0
+            print(f"{workers:>3} процессов: {stats['pages_per_s']:>8} стр/с, ускорение x{speedup:.2f}")
+
+
+if __name__ == '__main__':
+    main()
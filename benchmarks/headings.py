@@ -0,0 +1,92 @@
+"""
+Анализ заголовков на больших страницах: время и пиковая память.
+
+Сравниваются два входа analyze_headings из public/plugins/ozon-analyzer:
+упакованные буферы (levels / text_offsets / text_utf8) и массив объектов
+headings_list. Пик памяти меряется tracemalloc только на время анализа,
+без учета самих входных данных.
+
+Тексты заголовков уникальны, кроме каждого 50-го, который повторяет
+предыдущий: так проверяется худший для поиска дубликатов случай, когда
+почти каждый текст нужно запомнить. Сверх точно отслеживаемых текстов
+дубликаты ищет фильтр Блума, поэтому печатается и ожидаемое их число.
+
+Запуск: python benchmarks/headings.py [число заголовков]
+"""
+
+import array
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'python-host'))
+
+from js_bridge import JsBridgeStub  # noqa: E402
+from plugin_loader import LEGACY_PLUGINS_DIR, load_plugin  # noqa: E402
+
+
+def generate(count: int):
+    rng = random.Random(42)
+    headings = []
+    level = 1
+    for i in range(count):
+        level = max(1, min(6, level + rng.choice((-1, 0, 0, 1, 1, 2))))
+        if i % 97 == 0:
+            text = ''
+        elif i % 50 == 0:
+            text = f"Раздел {i - 1} товара"
+        else:
+            text = f"Раздел {i} товара"
+        headings.append({"tagName": f"H{level}", "textContent": text})
+    return headings
+
+
+def pack(headings):
+    levels = bytearray()
+    offsets = array.array('I', [0])
+    text = bytearray()
+    for heading in headings:
+        levels.append(int(heading["tagName"][1]))
+        text += heading["textContent"].encode('utf-8')
+        offsets.append(len(text))
+    return {"levels": bytes(levels), "text_offsets": offsets, "text_utf8": bytes(text)}
+
+
+def measure(server, input_data):
+    # Время и память меряются отдельными прогонами: tracemalloc сильно замедляет код
+    started = time.perf_counter()
+    result = server.analyze_headings(input_data)
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    server.analyze_headings(input_data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    server = load_plugin('ozon-analyzer', LEGACY_PLUGINS_DIR)
+    server.js = JsBridgeStub(quiet=True)
+
+    headings = generate(count)
+    packed = pack(headings)
+    expected = sum(
+        1 for i, heading in enumerate(headings)
+        if i and heading["textContent"] and heading["textContent"] == headings[i - 1]["textContent"]
+    )
+    print(f"Заголовков: {count}, ожидается дубликатов {expected}")
+    for name, input_data in (("packed", packed), ("headings_list", {"headings_list": headings})):
+        result, elapsed, peak = measure(server, input_data)
+        print(
+            f"{name:>14}: {elapsed * 1000:8.1f} мс, пик памяти {peak / 1024 / 1024:6.1f} МБ, "
+            f"пропусков {result['skipped_levels']['count']}, дубликатов {result['duplicates']['count']}"
+            f"{'' if result['duplicates']['complete'] else ' (приблизительно)'}, "
+            f"пустых {result['empty_headings']['count']}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,21 @@
+"""
+Загрузка mcp_server.py плагинов в обычном CPython для бенчмарков.
+"""
+
+import importlib.util
+import os
+from types import ModuleType
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLUGINS_DIR = os.path.join(REPO_ROOT, 'chrome-extension', 'public', 'plugins')
+LEGACY_PLUGINS_DIR = os.path.join(REPO_ROOT, 'public', 'plugins')
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_plugin(plugin_id: str, plugins_dir: str = PLUGINS_DIR) -> ModuleType:
+    """Импортирует mcp_server.py плагина как модуль, не запуская main()"""
+    path = os.path.join(plugins_dir, plugin_id, 'mcp_server.py')
+    spec = importlib.util.spec_from_file_location(f"plugin_{plugin_id.replace('-', '_')}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
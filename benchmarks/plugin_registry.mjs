@@ -0,0 +1,77 @@
+/**
+ * Стоимость getAvailablePlugins() из core/plugin-manager.js при росте числа плагинов.
+ *
+ * fetch подменяется: манифесты и registry.json синтетических плагинов отдаются
+ * с фиксированной задержкой. Сравниваются прежний последовательный обход манифестов
+ * (он повторялся при каждом открытии панели), первый вызов с индексом реестра,
+ * повторный вызов без изменений и вызов после изменения одного манифеста.
+ *
+ * Запуск: node --no-warnings benchmarks/plugin_registry.mjs [число плагинов] [задержка fetch, мс]
+ */
+import { createHash } from 'node:crypto';
+
+const [pluginCount = 50, latencyMs = 5] = process.argv.slice(2).map(Number);
+
+const sha256 = (text) => createHash('sha256').update(text).digest('hex');
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+const files = new Map();
+function writePlugin(pluginId, version) {
+  const manifest = JSON.stringify({
+    name: pluginId,
+    version,
+    description: `Плагин ${pluginId}`,
+    main_server: 'mcp_server.py',
+    icon: 'icon.svg',
+  });
+  files.set(`/plugins/${pluginId}/manifest.json`, manifest);
+}
+function writeRegistry() {
+  const plugins = {};
+  for (const [path, text] of files) {
+    const match = path.match(/^\/plugins\/([^/]+)\/manifest\.json$/);
+    if (match) plugins[match[1]] = { manifest_sha256: sha256(text), main_server: 'mcp_server.py', server_sha256: '' };
+  }
+  files.set('/plugins/registry.json', JSON.stringify({ hash: sha256(JSON.stringify(plugins)), plugins }));
+}
+
+const pluginIds = Array.from({ length: pluginCount }, (_, i) => `plugin-${i}`);
+pluginIds.forEach((pluginId) => writePlugin(pluginId, '1.0.0'));
+writeRegistry();
+
+let fetches = 0;
+globalThis.fetch = async (url) => {
+  fetches += 1;
+  await sleep(latencyMs);
+  const text = files.get(url);
+  return { ok: text !== undefined, statusText: 'Not Found', json: async () => JSON.parse(text) };
+};
+
+// Прежняя реализация: манифесты по одному из фиксированного списка
+async function getAvailablePluginsSequential() {
+  const plugins = [];
+  for (const dirName of pluginIds) {
+    const response = await fetch(`/plugins/${dirName}/manifest.json`);
+    const manifest = await response.json();
+    plugins.push({ id: dirName, ...manifest, iconUrl: `/plugins/${dirName}/${manifest.icon}` });
+  }
+  return plugins;
+}
+
+async function measure(label, call) {
+  fetches = 0;
+  const startedAt = performance.now();
+  const plugins = await call();
+  const elapsedMs = performance.now() - startedAt;
+  console.log(`${label.padEnd(28)} ${elapsedMs.toFixed(1).padStart(8)} мс  запросов ${String(fetches).padStart(4)}  плагинов ${plugins.length}`);
+}
+
+const { getAvailablePlugins } = await import('../core/plugin-manager.js');
+
+console.log(`Плагинов: ${pluginCount}, задержка fetch ${latencyMs} мс`);
+await measure('последовательно (раньше)', getAvailablePluginsSequential);
+await measure('реестр, первый вызов', getAvailablePlugins);
+await measure('реестр, без изменений', getAvailablePlugins);
+writePlugin(pluginIds[0], '1.0.1');
+writeRegistry();
+await measure('реестр, изменен 1 манифест', getAvailablePlugins);
@@ -0,0 +1,66 @@
+"""
+Экономия токенов промптов ozon-analyzer на корпусе карточек товаров.
+
+Запуск: python benchmarks/prompt_budget.py
+"""
+
+import json
+import os
+import re
+
+from plugin_loader import FIXTURES_DIR, load_plugin
+
+
+def ingredient_retention(original: str, compacted: str) -> float:
+    """Доля ингредиентов исходного состава, сохранившихся в сжатом промпте"""
+    ingredients = [item.strip() for item in re.split(r'[,;]', original) if item.strip()]
+    if not ingredients:
+        return 1.0
+    return sum(1 for item in ingredients if item in compacted) / len(ingredients)
+
+
+def warning_retention(warnings, compacted: str) -> float:
+    """Доля предупреждений карточки (противопоказания, побочные эффекты), сохранившихся в промпте"""
+    if not warnings:
+        return 1.0
+    return sum(1 for warning in warnings if warning in compacted) / len(warnings)
+
+
+def main():
+    server = load_plugin('ozon-analyzer')
+    prompts = [
+        ("basic", server.AI_MODELS["basic_analysis"], server.BASIC_ANALYSIS_PROMPT),
+        ("detailed", server.AI_MODELS["detailed_comparison"], server.DETAILED_COMPARISON_PROMPT),
+        ("deep", server.AI_MODELS["deep_analysis"], server.DEEP_ANALYSIS_PROMPT),
+    ]
+    totals = {name: {"original_tokens": 0, "compacted_tokens": 0} for name, _, _ in prompts}
+    worst_retention = 1.0
+    worst_warning_retention = 1.0
+
+    with open(os.path.join(FIXTURES_DIR, 'ozon_products.jsonl'), encoding='utf-8') as f:
+        products = [json.loads(line) for line in f if line.strip()]
+
+    for product in products:
+        context = server.get_prompt_context(product["description"], product["composition"])
+        for name, model, template in prompts:
+            stats = context.savings(model, template)
+            totals[name]["original_tokens"] += stats["original_tokens"]
+            totals[name]["compacted_tokens"] += stats["compacted_tokens"]
+            description, composition = context.fields_for(model)
+            worst_retention = min(worst_retention, ingredient_retention(product["composition"], composition))
+            worst_warning_retention = min(
+                worst_warning_retention, warning_retention(product.get("warnings", []), description))
+
+    print(f"Товаров в корпусе: {len(products)}")
+    for name, stats in totals.items():
+        saved = stats["original_tokens"] - stats["compacted_tokens"]
+        share = saved / stats["original_tokens"] * 100 if stats["original_tokens"] else 0
+        print(f"{name:>9}: {stats['original_tokens']:>6} -> {stats['compacted_tokens']:>6} токенов (-{share:.1f}%)")
+    print(f"Сохранность ингредиентов состава (минимум): {worst_retention * 100:.1f}%")
+    print(f"Сохранность предупреждений (минимум): {worst_warning_retention * 100:.1f}%")
+    if worst_retention < 1.0 or worst_warning_retention < 1.0:
+        raise SystemExit("Сжатие промпта потеряло ингредиенты или предупреждения")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Размер ответов analyze_product в ozon-analyzer и время их кодирования.
+
+Сравниваются полный ответ (по умолчанию), ответ со ссылками на большие
+тексты (max_inline_chars) и проекция только на оценку (fields). Встроенный в плагин
+HTML-парсер пока заглушка, поэтому описание и состав берутся из корпуса
+fixtures/ozon_products.jsonl подменой extract_description_and_composition.
+
+Запуск: python benchmarks/response_size.py [число повторов]
+"""
+
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from typing import List
+
+from plugin_loader import FIXTURES_DIR, load_plugin
+
+PAGE_HTML = 'https://www.ozon.ru/product/{index}/'
+
+VARIANTS = [
+    ("полный", {}),
+    ("ссылки", {"max_inline_chars": 1000}),
+    ("fields", {"fields": ["analysis.score", "message"]}),
+]
+
+
+async def run(server, products, repeats: int) -> List[str]:
+    report = []
+    for name, extra in VARIANTS:
+        total_bytes = 0
+        started = time.perf_counter()
+        for _ in range(repeats):
+            for index, product in enumerate(products):
+                server.extract_description_and_composition = (
+                    lambda _soup, product=product: (product["description"], product["composition"]))
+                params = dict(extra, page_html=PAGE_HTML.format(index=index))
+                line = json.dumps({"id": index, "method": "analyze_product", "params": params})
+                total_bytes += len((await server.server_loop.handle_message(line)).encode('utf-8'))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        calls = repeats * len(products)
+        report.append(f"{name:>7}: {total_bytes / calls:>8.0f} байт на ответ, {elapsed_ms / calls:.3f} мс на запрос")
+
+    # Текст по ссылке восстанавливается без потерь
+    sample = max(products, key=lambda product: len(product["description"]))
+    server.extract_description_and_composition = lambda _soup: (sample["description"], sample["composition"])
+    response = json.loads(await server.server_loop.handle_message(json.dumps(
+        {"method": "analyze_product",
+         "params": {"page_html": PAGE_HTML.format(index='sample'), "max_inline_chars": 1000}})))
+    ref = response["result"]["description"]["$ref"]
+    fetched = json.loads(await server.server_loop.handle_message(json.dumps(
+        {"method": "get_result_text", "params": {"ref": ref}})))
+    assert fetched["result"]["text"] == sample["description"]
+
+    stats = json.loads(await server.server_loop.handle_message(json.dumps({"method": "server_stats"})))["result"]
+    for method, entry in stats["responses"].items():
+        report.append(f"response_stats[{method}]: {entry['calls']} ответов, в среднем "
+                      f"{entry['bytes'] / entry['calls']:.0f} байт, кодирование {entry['encode_ms']:.1f} мс всего")
+    return report
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    server = load_plugin('ozon-analyzer')
+    with open(os.path.join(FIXTURES_DIR, 'ozon_products.jsonl'), encoding='utf-8') as f:
+        products = [json.loads(line) for line in f if line.strip()]
+    # Плагин печатает служебные сообщения в stdout, отчет выводится после прогона
+    with contextlib.redirect_stdout(io.StringIO()):
+        report = asyncio.run(run(server, products, repeats))
+    print('\n'.join(report))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Устойчивость цикла MCP серверов к битым и падающим запросам.
+
+Каждый сервер запускается как отдельный процесс и получает поток запросов,
+в котором перемешаны корректные, битые и "отравленные" сообщения. Раньше
+первое же такое сообщение завершало сервер, и Pyodide приходилось
+инициализировать заново.
+
+Запуск: python benchmarks/server_resilience.py [число запросов]
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+from plugin_loader import PLUGINS_DIR
+
+# Основной метод каждого плагина; строка вместо params роняет его обработчик
+PLUGIN_METHODS = {
+    'ozon-analyzer': 'analyze_product',
+    'time-test': 'get_time',
+    'test-plugin': 'analyze_page',
+    'google-helper': 'analyze_search',
+}
+
+
+def build_stream(method: str, count: int) -> str:
+    lines = []
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:
+            lines.append('{"id": %d, "method": "ping"' % i)  # обрезанный JSON
+        elif kind == 1:
+            lines.append(json.dumps([i]))  # не объект
+        elif kind == 2:
+            lines.append(json.dumps({"id": i, "method": method, "params": "poison"}))
+        else:
+            lines.append(json.dumps({"id": i, "method": "ping"}))
+    lines.append(json.dumps({"id": "stats", "method": "server_stats"}))
+    return '\n'.join(lines) + '\n'
+
+
+def run_plugin(plugin_id: str, stream: str) -> dict:
+    server = os.path.join(PLUGINS_DIR, plugin_id, 'mcp_server.py')
+    completed = subprocess.run(
+        [sys.executable, server], input=stream, capture_output=True, text=True, encoding='utf-8'
+    )
+    for line in reversed(completed.stdout.splitlines()):
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(message, dict) and message.get('id') == 'stats':
+            return message['result']
+    raise RuntimeError(f"{plugin_id}: сервер завершился до ответа на server_stats")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"Запросов в потоке: {count}")
+    for plugin_id, method in PLUGIN_METHODS.items():
+        stats = run_plugin(plugin_id, build_stream(method, count))
+        print(
+            f"{plugin_id:>14}: запросов {stats['requests']}, ошибок {stats['errors']}, "
+            f"таймаутов {stats['timeouts']}, в карантине {stats['quarantine_size']}, "
+            f"отклонено карантином {stats['quarantine_hits']}, "
+            f"предотвращено холодных стартов {stats['cold_starts_avoided']}"
+        )
+
+
+if __name__ == '__main__':
+    main()
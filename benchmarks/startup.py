@@ -0,0 +1,79 @@
+"""
+Время до первого ответа на ping для каждого плагина.
+
+Каждый замер выполняется в отдельном процессе интерпретатора:
+- cold: исходник mcp_server.py компилируется и выполняется, как раньше в воркере;
+- warm: код берется из байткод-бандла (python-host/build_bundles.py).
+
+В браузере то же сравнение для Pyodide видно в логе воркера: сообщение
+"Python среда готова за N мс" с пометкой о восстановлении из снимка памяти.
+
+Запуск: python benchmarks/startup.py [число повторов]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOST_DIR = os.path.join(REPO_ROOT, 'python-host')
+sys.path.insert(0, HOST_DIR)
+
+from batch_host import PLUGINS_DIR  # noqa: E402
+from build_bundles import build_bundle  # noqa: E402
+
+# Выполняется в дочернем процессе: загрузка плагина и первый ping
+DRIVER = r'''
+import asyncio, importlib.util, io, json, marshal, sys, time, types, zipfile
+started = time.perf_counter()
+sys.path.insert(0, sys.argv[3])
+from batch_host import PluginRunner
+from js_bridge import JsBridgeStub
+mode, path = sys.argv[1], sys.argv[2]
+if mode == 'warm':
+    with zipfile.ZipFile(path) as archive:
+        pyc = archive.read('mcp_server.pyc')
+    code = marshal.loads(pyc[4:])
+else:
+    with open(path, encoding='utf-8') as f:
+        code = compile(f.read(), path, 'exec', dont_inherit=True)
+module = types.ModuleType('plugin')
+exec(code, module.__dict__)
+module.js = JsBridgeStub(offline=True, quiet=True)
+response = asyncio.run(PluginRunner(module).call('ping', {}))
+print(json.dumps({"ms": (time.perf_counter() - started) * 1000, "response": response}))
+'''
+
+
+def measure(mode: str, path: str) -> float:
+    completed = subprocess.run(
+        [sys.executable, '-c', DRIVER, mode, path, HOST_DIR],
+        capture_output=True, text=True, encoding='utf-8', check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])["ms"]
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"Медиана по {repeats} запускам, мс до первого ping")
+    with tempfile.TemporaryDirectory() as tmp:
+        for plugin_id in sorted(os.listdir(PLUGINS_DIR)):
+            plugin_dir = os.path.join(PLUGINS_DIR, plugin_id)
+            source_path = os.path.join(plugin_dir, 'mcp_server.py')
+            if not os.path.isfile(source_path):
+                continue
+            bundle_path = os.path.join(tmp, f'{plugin_id}.zip')
+            data, _meta = build_bundle(plugin_dir, plugin_id)
+            with open(bundle_path, 'wb') as f:
+                f.write(data)
+
+            cold = statistics.median(measure('cold', source_path) for _ in range(repeats))
+            warm = statistics.median(measure('warm', bundle_path) for _ in range(repeats))
+            print(f"{plugin_id:>14}: cold {cold:7.2f}  warm {warm:7.2f}  (x{cold / warm:.2f})")
+
+
+if __name__ == '__main__':
+    main()
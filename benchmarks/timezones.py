@@ -0,0 +1,74 @@
+"""
+Пропускная способность перевода времени: get_times против host_fetch.
+
+- get_times (time-test): один вызов переводит все timestamps во все зоны
+  по локальным таблицам переходов;
+- fetch_current_time (public/plugins/ozon-analyzer): один запрос к
+  worldtimeapi через host_fetch на каждую зону. Сеть имитируется задержкой
+  ответа хоста, по умолчанию 50 мс.
+
+Запуск: python benchmarks/timezones.py [число зон] [число timestamps] [задержка, мс]
+"""
+
+import asyncio
+import os
+import sys
+import time
+from zoneinfo import available_timezones
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'python-host'))
+
+from js_bridge import JsBridgeStub, wrap  # noqa: E402
+from plugin_loader import LEGACY_PLUGINS_DIR, load_plugin  # noqa: E402
+
+
+class SlowHostBridge(JsBridgeStub):
+    """host_fetch с задержкой сети и ответом в формате worldtimeapi"""
+
+    def __init__(self, latency: float):
+        super().__init__(quiet=True)
+        self.latency = latency
+
+    async def host_fetch(self, url: str):
+        await asyncio.sleep(self.latency)
+        return {"data": {"datetime": "2025-01-01T12:00:00+03:00", "timezone": url.rsplit('/', 2)[-1]}}
+
+
+async def run(zone_count: int, timestamp_count: int, latency: float):
+    zones = sorted(available_timezones())[:zone_count]
+    timestamps = [1_700_000_000 + i * 3_600 for i in range(timestamp_count)]
+
+    time_server = load_plugin('time-test')
+    # Первый вызов строит таблицы зон за год timestamps; далее они берутся из LRU
+    started = time.perf_counter()
+    await time_server.get_times({"timezones": zones, "timestamps": timestamps[:1]})
+    warmup = time.perf_counter() - started
+
+    started = time.perf_counter()
+    response = await time_server.get_times({"timezones": zones, "timestamps": timestamps})
+    bulk = time.perf_counter() - started
+    conversions = response["result"]["count"] * len(zones)
+
+    legacy_server = load_plugin('ozon-analyzer', LEGACY_PLUGINS_DIR)
+    legacy_server.js = SlowHostBridge(latency)
+    sample = zones[:min(len(zones), 20)]
+    started = time.perf_counter()
+    for zone in sample:
+        await legacy_server.fetch_current_time(wrap({"timezone": zone}))
+    per_call = (time.perf_counter() - started) / len(sample)
+
+    print(f"Зон: {len(zones)}, timestamps: {timestamp_count}, задержка host_fetch: {latency * 1000:.0f} мс")
+    print(f"  таблицы зон за год:     {warmup * 1000:8.1f} мс (однократно)")
+    print(f"  get_times:              {conversions / bulk:12.0f} переводов/с ({conversions} за {bulk * 1000:.1f} мс)")
+    print(f"  host_fetch по вызову:   {1 / per_call:12.1f} переводов/с")
+
+
+def main():
+    zone_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    timestamp_count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    latency = (float(sys.argv[3]) if len(sys.argv) > 3 else 50) / 1000
+    asyncio.run(run(zone_count, timestamp_count, latency))
+
+
+if __name__ == '__main__':
+    main()
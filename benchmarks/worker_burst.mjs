@@ -0,0 +1,134 @@
+/**
+ * Память Pyodide воркера при всплеске вызовов инструментов.
+ *
+ * Исходник chrome-extension/src/background/pyodide-worker.js выполняется в Node
+ * с подменным loadPyodide: вызов инструмента "конвертирует" вход в кучу Python
+ * (Buffer того же размера) и держит его, пока работает. Клиент повторяет логику
+ * mcp-bridge.ts: на ответ "перегружен" (-32002) ждет retryAfterMs с экспоненциальным
+ * ростом и отправляет вызов заново.
+ *
+ * Сравниваются лимиты воркера и прежнее поведение без очереди (все лимиты = Infinity).
+ * Печатаются пики памяти, удерживаемой воркером (очередь + куча Python),
+ * время обработки всплеска, число повторов и вызовов, отклоненных окончательно.
+ * Подменный вызов только ждет и не занимает процессор, поэтому время без лимитов
+ * занижено: настоящий интерпретатор Pyodide выполняет вызовы по одному.
+ *
+ * Запуск: node benchmarks/worker_burst.mjs [число вызовов] [размер входа, КБ] [время вызова, мс]
+ */
+import { readFileSync } from 'node:fs';
+import { dirname, join } from 'node:path';
+import { fileURLToPath } from 'node:url';
+import vm from 'node:vm';
+
+const REPO_ROOT = dirname(dirname(fileURLToPath(import.meta.url)));
+const WORKER_PATH = join(REPO_ROOT, 'chrome-extension', 'src', 'background', 'pyodide-worker.js');
+
+// Повторяет константы mcp-bridge.ts
+const OVERLOADED_ERROR_CODE = -32002;
+const MAX_OVERLOAD_RETRIES = 5;
+const BASE_RETRY_DELAY_MS = 250;
+
+const [burstSize = 200, inputKb = 1024, callMs = 20] = process.argv.slice(2).map(Number);
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+function makeFakePyodide(stats) {
+  const toolFunc = async (toolInput) => {
+    // Вход копируется в кучу wasm так же, как при toPy
+    const converted = Buffer.alloc(toolInput.text.length * 2);
+    stats.pythonBytes += converted.length;
+    stats.peakPythonBytes = Math.max(stats.peakPythonBytes, stats.pythonBytes);
+    await sleep(callMs);
+    stats.pythonBytes -= converted.length;
+    return { toJs: () => ({ length: converted.length }), destroy() {} };
+  };
+  const namespace = { set() {}, get: (name) => (name.startsWith('shape_tool_') ? undefined : toolFunc), destroy() {} };
+  const globals = {
+    set() {},
+    get(name) {
+      if (name === '_app_plugin_namespaces') return { has: () => true, destroy() {} };
+      return { callKwargs: () => namespace, destroy() {} };
+    },
+  };
+  return { globals, runPython() {}, loadPackagesFromImports: async () => {} };
+}
+
+async function runBurst(label, unbounded) {
+  let source = readFileSync(WORKER_PATH, 'utf-8');
+  if (unbounded) {
+    source = source.replace(/const (MAX_ACTIVE_CALLS|MAX_PENDING_CALLS|MAX_PENDING_BYTES) = [^;]+;/g, 'const $1 = Infinity;');
+  }
+
+  const stats = { pythonBytes: 0, peakPythonBytes: 0, heldBytes: 0, peakHeldBytes: 0 };
+  const heldByCall = new Map();
+  const pending = new Map();
+  let retries = 0;
+  let failures = 0;
+
+  const self = {
+    location: { origin: 'chrome-extension://benchmark' },
+    postMessage(data) {
+      if (data.type !== 'complete' && data.type !== 'error') return;
+      stats.heldBytes -= heldByCall.get(data.callId) ?? 0;
+      heldByCall.delete(data.callId);
+      queueMicrotask(() => onWorkerMessage(data));
+    },
+  };
+  const context = vm.createContext({
+    self,
+    console: { log() {}, warn() {} },
+    performance,
+    URL,
+    Response,
+    Uint8Array,
+    ArrayBuffer,
+    fetch: async () => ({ ok: false }),
+    importScripts() {},
+    loadPyodide: async () => makeFakePyodide(stats),
+  });
+  vm.runInContext(source, context);
+
+  const postToWorker = (request) => {
+    // Структурное клонирование: воркер держит собственную копию входа
+    const bytes = request.toolInput.text.length * 2;
+    heldByCall.set(request.callId, bytes);
+    stats.heldBytes += bytes;
+    stats.peakHeldBytes = Math.max(stats.peakHeldBytes, stats.heldBytes + stats.pythonBytes);
+    self.onmessage({ data: structuredClone(request) });
+  };
+
+  function onWorkerMessage({ type, callId, code, retryAfterMs }) {
+    const call = pending.get(callId);
+    if (type === 'error' && code === OVERLOADED_ERROR_CODE && call.attempts < MAX_OVERLOAD_RETRIES) {
+      call.attempts += 1;
+      retries += 1;
+      const backoffMs = BASE_RETRY_DELAY_MS * 2 ** (call.attempts - 1);
+      setTimeout(() => postToWorker(call.request), Math.max(retryAfterMs ?? 0, backoffMs) * (1 + Math.random() * 0.2));
+      return;
+    }
+    if (type === 'error') failures += 1;
+    pending.delete(callId);
+    call.resolve();
+  }
+
+  const text = 'x'.repeat(inputKb * 512);
+  const startedAt = performance.now();
+  const calls = [];
+  for (let i = 0; i < burstSize; i++) {
+    const request = { type: 'run_python_tool', callId: `call_${i}`, pluginId: 'ozon-analyzer', toolName: 'analyze', toolInput: { text } };
+    calls.push(new Promise((resolve) => pending.set(request.callId, { request, attempts: 0, resolve })));
+    postToWorker(request);
+  }
+  await Promise.all(calls);
+  const elapsedMs = performance.now() - startedAt;
+
+  const mb = (bytes) => (bytes / 1024 / 1024).toFixed(1).padStart(8);
+  console.log(
+    `${label.padEnd(12)} пик воркера ${mb(stats.peakHeldBytes)} МБ  пик кучи Python ${mb(stats.peakPythonBytes)} МБ  ` +
+      `время ${(elapsedMs / 1000).toFixed(2).padStart(6)} с  повторов ${String(retries).padStart(4)}  отклонено ${failures}`,
+  );
+}
+
+console.log(`Всплеск: ${burstSize} вызовов по ${inputKb} КБ, ${callMs} мс на вызов`);
+await runBurst('без лимитов', true);
+await runBurst('с очередью', false);
@@ -7,12 +7,208 @@ Google Helper MCP Server
 import sys
 import json
 import asyncio
-from typing import Any, Dict
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+# Сколько секунд может выполняться запрос, прежде чем watchdog его отменит
+REQUEST_TIMEOUT_SECONDS = 30
+
+# --- mcp-server-loop: begin (копия python-host/server_loop.py, правьте там и запускайте sync_server_loop.py) ---
+class McpServerLoop:
+    """Цикл MCP-сервера поверх stdio, изолирующий ошибки отдельных запросов.
+
+    Каждая строка stdin обрабатывается своей задачей, поэтому долгий или
+    зависший обработчик не задерживает остальные запросы. Watchdog отменяет
+    обработчик, не ответивший за timeout секунд, и отвечает ошибкой; повторно
+    запрос не запускается, так как обработчики не идемпотентны (вызовы моделей).
+
+    В карантин попадает только детерминированное падение: запрос, который
+    poison_threshold раз подряд роняет обработчик с одной и той же ошибкой.
+    Карантин и счетчики падений истекают через quarantine_ttl секунд.
+
+    cold_starts_avoided считает ошибки разбора и падения обработчика, которые
+    раньше роняли процесс и вынуждали заново запускать сервер. Таймауты и
+    отказы карантина сюда не входят: сервер на них и раньше не падал.
+    """
+
+    # Под этим именем учитываются ответы на нераспознанные сообщения
+    INVALID_METHOD = '<invalid>'
+
+    def __init__(self, process_request: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                 timeout: float = 30.0, poison_threshold: int = 2,
+                 quarantine_ttl: float = 300.0, quarantine_size: int = 128):
+        self.process_request = process_request
+        self.timeout = timeout
+        self.poison_threshold = poison_threshold
+        self.quarantine_ttl = quarantine_ttl
+        self.quarantine_size = quarantine_size
+        self.stats = {
+            "requests": 0,
+            "errors": 0,
+            "timeouts": 0,
+            "quarantined": 0,
+            "quarantine_hits": 0,
+            "cold_starts_avoided": 0
+        }
+        # Ключ сообщения -> (ошибка, число падений подряд, когда истекает)
+        self.failures: "OrderedDict[str, Tuple[str, int, float]]" = OrderedDict()
+        # Ключ сообщения -> (причина, когда истекает)
+        self.quarantine: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        # Размер ответов и время их кодирования по методам
+        self.response_stats: Dict[str, Dict[str, float]] = {}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Счетчики цикла для метода server_stats"""
+        self.expire(time.monotonic())
+        return dict(
+            self.stats,
+            quarantine_size=len(self.quarantine),
+            responses={method: dict(stats) for method, stats in self.response_stats.items()}
+        )
+
+    async def serve(self):
+        """Читает запросы из stdin и пишет ответы в stdout до конца ввода"""
+        # Ответы пишутся в UTF-8 без экранирования, независимо от локали процесса
+        if hasattr(sys.stdout, 'reconfigure'):
+            sys.stdout.reconfigure(encoding='utf-8')
+
+        loop = asyncio.get_running_loop()
+        pending = set()
+        while True:
+            # stdin читается в отдельном потоке, чтобы запросы выполнялись, пока ждем следующую строку
+            line = await loop.run_in_executor(None, sys.stdin.readline)
+            if not line:
+                break
+            if not line.strip():
+                continue
+            # Ответы могут прийти не в порядке запросов, их сопоставляют по id
+            task = asyncio.ensure_future(self.respond(line))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+        if pending:
+            await asyncio.gather(*pending)
+
+    async def respond(self, line: str):
+        """Обрабатывает строку запроса и пишет ответ в stdout одной записью"""
+        sys.stdout.write(await self.handle_message(line) + '\n')
+        sys.stdout.flush()
+
+    async def handle_message(self, line: str) -> str:
+        """Обрабатывает строку запроса и возвращает закодированный ответ"""
+        method, response = await self.dispatch_message(line)
+        started = time.perf_counter()
+        # Кириллица без \uXXXX-экранирования занимает вдвое-втрое меньше
+        encoded = json.dumps(response, ensure_ascii=False, separators=(',', ':'))
+        self.record_response(method, len(encoded.encode('utf-8')), time.perf_counter() - started)
+        return encoded
+
+    def record_response(self, method: str, size: int, seconds: float):
+        """Учитывает размер и время кодирования ответа метода"""
+        stats = self.response_stats.setdefault(method, {"calls": 0, "bytes": 0, "max_bytes": 0, "encode_ms": 0.0})
+        stats["calls"] += 1
+        stats["bytes"] += size
+        stats["max_bytes"] = max(stats["max_bytes"], size)
+        stats["encode_ms"] += seconds * 1000
+
+    async def dispatch_message(self, line: str) -> Tuple[str, Dict[str, Any]]:
+        """Обрабатывает одну строку запроса, не давая ошибке остановить сервер.
+
+        Возвращает метод запроса и ответ.
+        """
+        self.stats["requests"] += 1
+
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            self.stats["errors"] += 1
+            self.stats["cold_starts_avoided"] += 1
+            return self.INVALID_METHOD, self.error(-32700, f"Parse error: {str(e)}")
+
+        if not isinstance(request, dict):
+            self.stats["errors"] += 1
+            self.stats["cold_starts_avoided"] += 1
+            return self.INVALID_METHOD, self.error(-32600, "Invalid request: ожидался JSON-объект")
+
+        method = str(request.get('method'))
+        key = self.message_key(request)
+        now = time.monotonic()
+        self.expire(now)
+        if key in self.quarantine:
+            self.stats["quarantine_hits"] += 1
+            reason, _expires = self.quarantine[key]
+            return method, self.with_request_id(request, self.error(-32001, f"Запрос помещен в карантин: {reason}"))
+
+        try:
+            response = await asyncio.wait_for(self.process_request(request), self.timeout)
+        except asyncio.TimeoutError:
+            # Зависание может быть временным (сеть, лимиты модели), поэтому без карантина
+            self.stats["errors"] += 1
+            self.stats["timeouts"] += 1
+            return method, self.with_request_id(
+                request, self.error(-32603, f"Internal error: обработчик не ответил за {self.timeout:g} с"))
+        except Exception as e:
+            self.stats["errors"] += 1
+            self.stats["cold_starts_avoided"] += 1
+            failure = f"{type(e).__name__}: {str(e)}"
+            self.remember_failure(key, failure, now)
+            return method, self.with_request_id(request, self.error(-32603, f"Internal error: {failure}"))
+
+        self.failures.pop(key, None)
+        return method, self.with_request_id(request, response)
+
+    def remember_failure(self, key: str, failure: str, now: float):
+        """Считает падения подряд с одной ошибкой и помещает такое сообщение в карантин"""
+        previous = self.failures.pop(key, None)
+        count = previous[1] + 1 if previous and previous[0] == failure else 1
+        if count < self.poison_threshold:
+            self.bounded_put(self.failures, key, (failure, count, now + self.quarantine_ttl))
+            return
+        self.bounded_put(self.quarantine, key, (failure, now + self.quarantine_ttl))
+        self.stats["quarantined"] += 1
+
+    def expire(self, now: float):
+        """Удаляет истекшие записи карантина и счетчиков падений"""
+        for entries in (self.quarantine, self.failures):
+            for key in [key for key, entry in entries.items() if entry[-1] <= now]:
+                del entries[key]
+
+    def bounded_put(self, entries: "OrderedDict[str, Any]", key: str, value: Any):
+        """Добавляет запись, вытесняя самую старую при переполнении"""
+        entries[key] = value
+        while len(entries) > self.quarantine_size:
+            entries.popitem(last=False)
+
+    @staticmethod
+    def message_key(request: Dict[str, Any]) -> str:
+        """Ключ сообщения без учета ID, чтобы повторы одного запроса совпадали"""
+        body = json.dumps([request.get('method'), request.get('params')], sort_keys=True, default=str)
+        return hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def with_request_id(request: Dict[str, Any], response: Dict[str, Any]) -> Dict[str, Any]:
+        """Добавляет ID запроса к ответу"""
+        if 'id' in request:
+            response['id'] = request['id']
+        return response
+
+    @staticmethod
+    def error(code: int, message: str) -> Dict[str, Any]:
+        return {
+            "error": {
+                "code": code,
+                "message": message
+            }
+        }
+# --- mcp-server-loop: end ---
 
 class GoogleHelper:
     def __init__(self):
         self.name = "Google Helper"
         self.version = "1.0.0"
+        self.server_loop = McpServerLoop(self.handle_request, timeout=REQUEST_TIMEOUT_SECONDS)
         
     async def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
         """Обрабатывает входящие запросы"""
@@ -20,6 +216,8 @@ class GoogleHelper:
         
         if method == 'ping':
             return await self.ping()
+        elif method == 'server_stats':
+            return {'result': self.server_loop.snapshot()}
         elif method == 'analyze_search':
             return await self.analyze_search(request.get('params', {}))
         else:
@@ -78,46 +276,8 @@ async def main():
     sys.stdout.write(json.dumps(welcome) + '\n')
     sys.stdout.flush()
     
-    # Основной цикл обработки запросов
-    while True:
-        try:
-            line = sys.stdin.readline()
-            if not line:
-                break
-                
-            request = json.loads(line.strip())
-            response = await plugin.handle_request(request)
-            
-            # Добавляем ID запроса к ответу
-            if 'id' in request:
-                response['id'] = request['id']
-            
-            sys.stdout.write(json.dumps(response) + '\n')
-            sys.stdout.flush()
-            
-        except json.JSONDecodeError as e:
-            error_response = {
-                'error': {
-                    'code': -32700,
-                    'message': f'Parse error: {str(e)}'
-                }
-            }
-            if 'id' in request:
-                error_response['id'] = request['id']
-            sys.stdout.write(json.dumps(error_response) + '\n')
-            sys.stdout.flush()
-            
-        except Exception as e:
-            error_response = {
-                'error': {
-                    'code': -32603,
-                    'message': f'Internal error: {str(e)}'
-                }
-            }
-            if 'id' in request:
-                error_response['id'] = request['id']
-            sys.stdout.write(json.dumps(error_response) + '\n')
-            sys.stdout.flush()
+    # Основной цикл обработки запросов; ошибки изолированы в McpServerLoop
+    await plugin.server_loop.serve()
 
 if __name__ == '__main__':
     asyncio.run(main()) 
\ No newline at end of file
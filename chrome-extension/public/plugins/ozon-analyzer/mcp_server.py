@@ -1,8 +1,13 @@
 import sys
 import json
 import asyncio
+import copy
+import hashlib
+import math
 import re
-from typing import Any, Dict, List
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 # from bs4 import BeautifulSoup  # Может не работать в Pyodide
 
 # Простой HTML парсер для Pyodide
@@ -52,43 +57,355 @@ AI_MODELS = {
     "scraping_fallback": "gemini-flash"
 }
 
-async def main():
-    """Основная функция MCP сервера для анализатора Ozon"""
-    global js
-    
-    try:
+# Бюджет токенов на контекст товара (описание + состав) для каждой модели
+PROMPT_TOKEN_BUDGETS = {
+    "gemini-flash": 1000,
+    "gemini-pro": 2000,
+    "gemini-25": 4000
+}
+DEFAULT_PROMPT_TOKEN_BUDGET = 1000
+
+# Сколько сжатых контекстов товаров держать в памяти
+PROMPT_CONTEXT_CACHE_SIZE = 32
+
+# Сколько символов текста остается в ответе рядом со ссылкой на него
+RESULT_PREVIEW_CHARS = 200
+
+# Сколько символов текста держит хранилище результатов, прежде чем вытеснять старые
+RESULT_STORE_MAX_CHARS = 2_000_000
+
+# Рекламные фразы, не несущие информации о свойствах и составе товара.
+# Границы слов обязательны: без них "акци" находится в "реакции" и "фракция".
+MARKETING_RE = re.compile(
+    r'\b(?:хит продаж|лучш\w* цен\w*|спешите|успейте|только сегодня|закажите сейчас|'
+    r'бесплатн\w* доставк\w*|гаранти\w* качеств\w*|оригинальн\w* продукци\w*|'
+    r'в наличии|скидк\w*|акци(?:я|и|ю|ей))\b',
+    re.IGNORECASE
+)
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?…;])\s+|\n+')
+REPEATED_PUNCTUATION_RE = re.compile(r'([!?.])\1+')
+
+# Рекламное предложение длиннее этого считается содержательным и не удаляется
+MARKETING_SENTENCE_MAX_LENGTH = 120
+
+BASIC_ANALYSIS_PROMPT = """
+        Проанализируй соответствие описания товара и его состава.
+        
+        Описание: {description}
+        Состав: {composition}
+        
+        Оцени по шкале от 1 до 10, где:
+        1 - полное несоответствие
+        10 - полное соответствие
+        
+        Верни JSON в формате:
+        {{
+            "score": число,
+            "reasoning": "объяснение оценки",
+            "details": ["деталь 1", "деталь 2"]
+        }}
+        """
+
+DETAILED_COMPARISON_PROMPT = """
+        Проведи детальный анализ соответствия описания и состава товара.
+        
+        Описание: {description}
+        Состав: {composition}
+        
+        Проанализируй:
+        1. Соответствие заявленных свойств составу
+        2. Качество и полезность ингредиентов
+        3. Потенциальные риски или преимущества
+        4. Рекомендации по использованию
+        
+        Верни структурированный анализ.
+        """
+
+DEEP_ANALYSIS_PROMPT = """
+        Проведи глубокий анализ товара с медицинской и научной точки зрения.
+        
+        Описание: {description}
+        Состав: {composition}
+        
+        Проанализируй:
+        1. Научную обоснованность заявленных свойств
+        2. Потенциальные побочные эффекты и противопоказания
+        3. Взаимодействие с другими препаратами
+        4. Эффективность по сравнению с аналогами
+        5. Рекомендации по применению
+        6. Альтернативные варианты
+        
+        Верни детальный анализ в структурированном виде.
+        """
+
+# Сколько секунд может выполняться запрос, прежде чем watchdog его отменит
+REQUEST_TIMEOUT_SECONDS = 120
+
+# --- mcp-server-loop: begin (копия python-host/server_loop.py, правьте там и запускайте sync_server_loop.py) ---
+class McpServerLoop:
+    """Цикл MCP-сервера поверх stdio, изолирующий ошибки отдельных запросов.
+
+    Каждая строка stdin обрабатывается своей задачей, поэтому долгий или
+    зависший обработчик не задерживает остальные запросы. Watchdog отменяет
+    обработчик, не ответивший за timeout секунд, и отвечает ошибкой; повторно
+    запрос не запускается, так как обработчики не идемпотентны (вызовы моделей).
+
+    В карантин попадает только детерминированное падение: запрос, который
+    poison_threshold раз подряд роняет обработчик с одной и той же ошибкой.
+    Карантин и счетчики падений истекают через quarantine_ttl секунд.
+
+    cold_starts_avoided считает ошибки разбора и падения обработчика, которые
+    раньше роняли процесс и вынуждали заново запускать сервер. Таймауты и
+    отказы карантина сюда не входят: сервер на них и раньше не падал.
+    """
+
+    # Под этим именем учитываются ответы на нераспознанные сообщения
+    INVALID_METHOD = '<invalid>'
+
+    def __init__(self, process_request: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                 timeout: float = 30.0, poison_threshold: int = 2,
+                 quarantine_ttl: float = 300.0, quarantine_size: int = 128):
+        self.process_request = process_request
+        self.timeout = timeout
+        self.poison_threshold = poison_threshold
+        self.quarantine_ttl = quarantine_ttl
+        self.quarantine_size = quarantine_size
+        self.stats = {
+            "requests": 0,
+            "errors": 0,
+            "timeouts": 0,
+            "quarantined": 0,
+            "quarantine_hits": 0,
+            "cold_starts_avoided": 0
+        }
+        # Ключ сообщения -> (ошибка, число падений подряд, когда истекает)
+        self.failures: "OrderedDict[str, Tuple[str, int, float]]" = OrderedDict()
+        # Ключ сообщения -> (причина, когда истекает)
+        self.quarantine: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        # Размер ответов и время их кодирования по методам
+        self.response_stats: Dict[str, Dict[str, float]] = {}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Счетчики цикла для метода server_stats"""
+        self.expire(time.monotonic())
+        return dict(
+            self.stats,
+            quarantine_size=len(self.quarantine),
+            responses={method: dict(stats) for method, stats in self.response_stats.items()}
+        )
+
+    async def serve(self):
+        """Читает запросы из stdin и пишет ответы в stdout до конца ввода"""
+        # Ответы пишутся в UTF-8 без экранирования, независимо от локали процесса
+        if hasattr(sys.stdout, 'reconfigure'):
+            sys.stdout.reconfigure(encoding='utf-8')
+
+        loop = asyncio.get_running_loop()
+        pending = set()
         while True:
-            line = sys.stdin.readline()
+            # stdin читается в отдельном потоке, чтобы запросы выполнялись, пока ждем следующую строку
+            line = await loop.run_in_executor(None, sys.stdin.readline)
             if not line:
                 break
-                
+            if not line.strip():
+                continue
+            # Ответы могут прийти не в порядке запросов, их сопоставляют по id
+            task = asyncio.ensure_future(self.respond(line))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+        if pending:
+            await asyncio.gather(*pending)
+
+    async def respond(self, line: str):
+        """Обрабатывает строку запроса и пишет ответ в stdout одной записью"""
+        sys.stdout.write(await self.handle_message(line) + '\n')
+        sys.stdout.flush()
+
+    async def handle_message(self, line: str) -> str:
+        """Обрабатывает строку запроса и возвращает закодированный ответ"""
+        method, response = await self.dispatch_message(line)
+        started = time.perf_counter()
+        # Кириллица без \uXXXX-экранирования занимает вдвое-втрое меньше
+        encoded = json.dumps(response, ensure_ascii=False, separators=(',', ':'))
+        self.record_response(method, len(encoded.encode('utf-8')), time.perf_counter() - started)
+        return encoded
+
+    def record_response(self, method: str, size: int, seconds: float):
+        """Учитывает размер и время кодирования ответа метода"""
+        stats = self.response_stats.setdefault(method, {"calls": 0, "bytes": 0, "max_bytes": 0, "encode_ms": 0.0})
+        stats["calls"] += 1
+        stats["bytes"] += size
+        stats["max_bytes"] = max(stats["max_bytes"], size)
+        stats["encode_ms"] += seconds * 1000
+
+    async def dispatch_message(self, line: str) -> Tuple[str, Dict[str, Any]]:
+        """Обрабатывает одну строку запроса, не давая ошибке остановить сервер.
+
+        Возвращает метод запроса и ответ.
+        """
+        self.stats["requests"] += 1
+
+        try:
             request = json.loads(line)
-            response = await process_request(request)
-            
-            sys.stdout.write(json.dumps(response) + '\n')
-            sys.stdout.flush()
-            
-    except Exception as e:
-        error_response = {
+        except json.JSONDecodeError as e:
+            self.stats["errors"] += 1
+            self.stats["cold_starts_avoided"] += 1
+            return self.INVALID_METHOD, self.error(-32700, f"Parse error: {str(e)}")
+
+        if not isinstance(request, dict):
+            self.stats["errors"] += 1
+            self.stats["cold_starts_avoided"] += 1
+            return self.INVALID_METHOD, self.error(-32600, "Invalid request: ожидался JSON-объект")
+
+        method = str(request.get('method'))
+        key = self.message_key(request)
+        now = time.monotonic()
+        self.expire(now)
+        if key in self.quarantine:
+            self.stats["quarantine_hits"] += 1
+            reason, _expires = self.quarantine[key]
+            return method, self.with_request_id(request, self.error(-32001, f"Запрос помещен в карантин: {reason}"))
+
+        try:
+            response = await asyncio.wait_for(self.process_request(request), self.timeout)
+        except asyncio.TimeoutError:
+            # Зависание может быть временным (сеть, лимиты модели), поэтому без карантина
+            self.stats["errors"] += 1
+            self.stats["timeouts"] += 1
+            return method, self.with_request_id(
+                request, self.error(-32603, f"Internal error: обработчик не ответил за {self.timeout:g} с"))
+        except Exception as e:
+            self.stats["errors"] += 1
+            self.stats["cold_starts_avoided"] += 1
+            failure = f"{type(e).__name__}: {str(e)}"
+            self.remember_failure(key, failure, now)
+            return method, self.with_request_id(request, self.error(-32603, f"Internal error: {failure}"))
+
+        self.failures.pop(key, None)
+        return method, self.with_request_id(request, response)
+
+    def remember_failure(self, key: str, failure: str, now: float):
+        """Считает падения подряд с одной ошибкой и помещает такое сообщение в карантин"""
+        previous = self.failures.pop(key, None)
+        count = previous[1] + 1 if previous and previous[0] == failure else 1
+        if count < self.poison_threshold:
+            self.bounded_put(self.failures, key, (failure, count, now + self.quarantine_ttl))
+            return
+        self.bounded_put(self.quarantine, key, (failure, now + self.quarantine_ttl))
+        self.stats["quarantined"] += 1
+
+    def expire(self, now: float):
+        """Удаляет истекшие записи карантина и счетчиков падений"""
+        for entries in (self.quarantine, self.failures):
+            for key in [key for key, entry in entries.items() if entry[-1] <= now]:
+                del entries[key]
+
+    def bounded_put(self, entries: "OrderedDict[str, Any]", key: str, value: Any):
+        """Добавляет запись, вытесняя самую старую при переполнении"""
+        entries[key] = value
+        while len(entries) > self.quarantine_size:
+            entries.popitem(last=False)
+
+    @staticmethod
+    def message_key(request: Dict[str, Any]) -> str:
+        """Ключ сообщения без учета ID, чтобы повторы одного запроса совпадали"""
+        body = json.dumps([request.get('method'), request.get('params')], sort_keys=True, default=str)
+        return hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def with_request_id(request: Dict[str, Any], response: Dict[str, Any]) -> Dict[str, Any]:
+        """Добавляет ID запроса к ответу"""
+        if 'id' in request:
+            response['id'] = request['id']
+        return response
+
+    @staticmethod
+    def error(code: int, message: str) -> Dict[str, Any]:
+        return {
             "error": {
-                "code": -32603,
-                "message": f"Internal error: {str(e)}"
+                "code": code,
+                "message": message
             }
         }
-        sys.stdout.write(json.dumps(error_response) + '\n')
-        sys.stdout.flush()
+# --- mcp-server-loop: end ---
+
+class InflightCall:
+    """Выполняющийся запрос, к которому присоединяются одинаковые конкурентные запросы"""
+    def __init__(self, task: "asyncio.Future"):
+        self.task = task
+        self.waiters = 0
+
+# Запросы в процессе выполнения, по ключу содержимого
+inflight_calls: Dict[str, InflightCall] = {}
+
+class ResultStore:
+    """Хранилище больших текстовых полей ответов.
+    
+    Вместо текста в ответ попадает ссылка, а сам текст можно получить позже
+    методом get_result_text. Ссылка строится по хешу текста, поэтому одинаковые
+    тексты хранятся один раз. При переполнении вытесняются давно не читанные тексты.
+    """
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.total_chars = 0
+        self.texts: "OrderedDict[str, str]" = OrderedDict()
+    
+    def put(self, text: str) -> str:
+        ref = make_request_key('result_text', text)[:32]
+        if ref in self.texts:
+            self.texts.move_to_end(ref)
+            return ref
+        self.texts[ref] = text
+        self.total_chars += len(text)
+        while self.total_chars > self.max_chars and len(self.texts) > 1:
+            _ref, evicted = self.texts.popitem(last=False)
+            self.total_chars -= len(evicted)
+        return ref
+    
+    def get(self, ref: str):
+        text = self.texts.get(ref)
+        if text is not None:
+            self.texts.move_to_end(ref)
+        return text
+
+result_store = ResultStore(RESULT_STORE_MAX_CHARS)
+
+async def main():
+    """Основная функция MCP сервера для анализатора Ozon"""
+    global js
+    
+    # Каждый запрос выполняется своей задачей: одинаковые конкурентные запросы
+    # объединяются в run_coalesced, а долгий запрос не задерживает остальные
+    await server_loop.serve()
 
 async def process_request(request: Dict[str, Any]) -> Dict[str, Any]:
     """Обработка MCP запросов"""
     method = request.get('method')
     params = request.get('params', {})
     
+    if method in ('analyze_product', 'deep_analysis'):
+        # Параметры формы ответа проверяются до анализа, а не после него
+        try:
+            fields, max_inline_chars = shape_options(params)
+        except ValueError as e:
+            return invalid_params(str(e))
+    
     if method == 'analyze_product':
-        return await analyze_ozon_product(params)
+        response = await analyze_ozon_product(params)
+        return shape_response(response, fields, max_inline_chars)
     elif method == 'deep_analysis':
-        return await perform_deep_analysis(params.get('description', ''), params.get('composition', ''))
+        response = await perform_deep_analysis(params.get('description', ''), params.get('composition', ''))
+        return shape_response(response, fields, max_inline_chars)
+    elif method == 'get_result_text':
+        return get_result_text(params)
     elif method == 'ping':
         return {"result": "pong"}
+    elif method == 'server_stats':
+        return {"result": dict(
+            server_loop.snapshot(),
+            result_store={"texts": len(result_store.texts), "chars": result_store.total_chars}
+        )}
     else:
         return {
             "error": {
@@ -97,8 +414,198 @@ async def process_request(request: Dict[str, Any]) -> Dict[str, Any]:
             }
         }
 
+server_loop = McpServerLoop(process_request, timeout=REQUEST_TIMEOUT_SECONDS)
+
+def normalize_page_html(page_html: str) -> str:
+    """Схлопывает пробельные символы, чтобы одинаковые страницы давали один ключ"""
+    return re.sub(r'\s+', ' ', page_html)
+
+def make_request_key(method: str, *parts: str) -> str:
+    """Строит ключ запроса из хеша метода и его содержимого"""
+    digest = hashlib.sha256(method.encode('utf-8'))
+    for part in parts:
+        digest.update(b'\0')
+        digest.update(part.encode('utf-8'))
+    return digest.hexdigest()
+
+async def run_coalesced(key: str, factory: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Выполняет запрос один раз для всех одинаковых конкурентных вызовов.
+    
+    Повторные запросы с тем же ключом присоединяются к уже запущенной задаче
+    и получают тот же результат. Задача отменяется, только когда отменены
+    все ожидающие её запросы; при этом она сразу убирается из inflight_calls,
+    чтобы новый запрос не присоединился к отменяемой задаче.
+    """
+    call = inflight_calls.get(key)
+    if call is None:
+        call = InflightCall(asyncio.ensure_future(factory()))
+        inflight_calls[key] = call
+        
+        def forget(_task, key=key, call=call):
+            if inflight_calls.get(key) is call:
+                del inflight_calls[key]
+        
+        call.task.add_done_callback(forget)
+    
+    call.waiters += 1
+    try:
+        # shield не даёт отмене одного ожидающего прервать общую задачу
+        result = await asyncio.shield(call.task)
+    finally:
+        call.waiters -= 1
+        if call.waiters == 0 and not call.task.done():
+            if inflight_calls.get(key) is call:
+                del inflight_calls[key]
+            call.task.cancel()
+    
+    # Каждый вызывающий получает свою копию, чтобы изменения не влияли на других
+    return copy.deepcopy(result)
+
+def invalid_params(message: str) -> Dict[str, Any]:
+    return {
+        "error": {
+            "code": -32602,
+            "message": message
+        }
+    }
+
+def read_count_param(params: Dict[str, Any], name: str) -> Optional[int]:
+    """Неотрицательное целое из параметров запроса или None, ValueError при неверном значении"""
+    value = params.get(name)
+    if value is None:
+        return None
+    try:
+        if isinstance(value, bool):
+            raise TypeError(name)
+        count = int(value)
+        if isinstance(value, float) and value != count:
+            raise ValueError(name)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"{name} должен быть целым числом, получено {value!r}") from None
+    return max(0, count)
+
+def shape_options(params: Dict[str, Any]) -> Tuple[Optional[List[str]], Optional[int]]:
+    """Разбирает fields и max_inline_chars, ValueError при неверных значениях"""
+    fields = params.get('fields')
+    if isinstance(fields, str):
+        fields = [field.strip() for field in fields.split(',') if field.strip()]
+    elif fields is not None and not (isinstance(fields, list) and all(isinstance(field, str) for field in fields)):
+        raise ValueError("fields должен быть списком путей или строкой через запятую")
+    return fields, read_count_param(params, 'max_inline_chars')
+
+def shape_response(response: Dict[str, Any], fields: Optional[List[str]],
+                   max_inline_chars: Optional[int]) -> Dict[str, Any]:
+    """Оставляет в ответе запрошенные поля и по запросу заменяет большие тексты ссылками.
+    
+    Параметры запроса, уже разобранные shape_options:
+    - fields: список путей через точку (или строка через запятую), например
+      ["analysis.score", "message"]; без него возвращаются все поля;
+    - max_inline_chars: строки длиннее этого числа символов возвращаются
+      ссылкой для get_result_text; без него тексты остаются в ответе целиком.
+    """
+    if "error" in response:
+        return response
+    # deep_analysis возвращает результат без обертки "result"
+    wrapped = "result" in response
+    payload = response["result"] if wrapped else response
+    
+    if fields and isinstance(payload, dict):
+        payload = project_fields(payload, fields)
+    if max_inline_chars is not None:
+        payload = offload_texts(payload, max_inline_chars)
+    
+    return {"result": payload} if wrapped else payload
+
+def shape_tool_options(tool_name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Вызывается pyodide-worker.js до запуска инструмента: разобранные параметры формы ответа или ошибка -32602"""
+    if tool_name == 'get_result_text':
+        return {}
+    try:
+        fields, max_inline_chars = shape_options(params)
+    except ValueError as e:
+        return invalid_params(str(e))
+    return {"fields": fields, "max_inline_chars": max_inline_chars}
+
+def shape_tool_result(tool_name: str, response: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+    """Вызывается pyodide-worker.js перед toJs, чтобы в JS конвертировались только нужные поля.
+    
+    options — результат shape_tool_options для этого вызова.
+    """
+    if tool_name == 'get_result_text':
+        return response
+    return shape_response(response, options.get('fields'), options.get('max_inline_chars'))
+
+def project_fields(payload: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """Копирует из payload только поля по путям через точку; отсутствующие пути пропускаются"""
+    projected: Dict[str, Any] = {}
+    for field in fields:
+        source: Any = payload
+        target = projected
+        parts = field.split('.')
+        for i, part in enumerate(parts):
+            if not isinstance(source, dict) or part not in source:
+                break
+            source = source[part]
+            if i == len(parts) - 1:
+                target[part] = source
+            else:
+                existing = target.get(part)
+                if not isinstance(existing, dict):
+                    existing = target[part] = {}
+                target = existing
+    return projected
+
+def offload_texts(value: Any, max_inline_chars: int) -> Any:
+    """Заменяет строки длиннее max_inline_chars ссылками в хранилище результатов"""
+    if isinstance(value, str):
+        if len(value) <= max_inline_chars:
+            return value
+        return {
+            "$ref": result_store.put(value),
+            "length": len(value),
+            "preview": value[:RESULT_PREVIEW_CHARS]
+        }
+    if isinstance(value, dict):
+        return {key: offload_texts(item, max_inline_chars) for key, item in value.items()}
+    if isinstance(value, list):
+        return [offload_texts(item, max_inline_chars) for item in value]
+    return value
+
+def get_result_text(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Возвращает текст по ссылке из ответа, целиком или фрагментом offset/limit"""
+    ref = params.get('ref', '')
+    if not isinstance(ref, str):
+        return invalid_params("ref должен быть строкой")
+    try:
+        offset = read_count_param(params, 'offset') or 0
+        limit = read_count_param(params, 'limit')
+    except ValueError as e:
+        return invalid_params(str(e))
+    text = result_store.get(ref)
+    if text is None:
+        return invalid_params(f"Текст по ссылке {ref!r} не найден или уже вытеснен, повторите исходный запрос")
+    end = len(text) if limit is None else min(len(text), offset + limit)
+    return {
+        "result": {
+            "ref": ref,
+            "text": text[offset:end],
+            "offset": offset,
+            "length": len(text),
+            "complete": end >= len(text)
+        }
+    }
+
 async def analyze_ozon_product(params: Dict[str, Any]) -> Dict[str, Any]:
-    """Анализ товара на Ozon"""
+    """Анализ товара на Ozon.
+    
+    Одинаковые конкурентные вызовы - из MCP-цикла или из воркера, который
+    вызывает эту функцию напрямую - выполняют один анализ.
+    """
+    key = make_request_key('analyze_product', normalize_page_html(params.get('page_html', '')))
+    return await run_coalesced(key, lambda: run_product_analysis(params))
+
+async def run_product_analysis(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Выполняет анализ товара на Ozon"""
     try:
         # Получаем HTML страницы
         page_html = params.get('page_html', '')
@@ -309,24 +816,15 @@ async def check_deep_analysis_availability() -> bool:
         return False
 
 async def perform_deep_analysis(description: str, composition: str) -> Dict[str, Any]:
+    """Глубокий анализ; одинаковые конкурентные вызовы выполняют один анализ"""
+    key = make_request_key('deep_analysis', description, composition)
+    return await run_coalesced(key, lambda: run_deep_analysis(description, composition))
+
+async def run_deep_analysis(description: str, composition: str) -> Dict[str, Any]:
     """Выполняет глубокий анализ с помощью Gemini 2.5 Pro"""
     try:
-        prompt = f"""
-        Проведи глубокий анализ товара с медицинской и научной точки зрения.
-        
-        Описание: {description}
-        Состав: {composition}
-        
-        Проанализируй:
-        1. Научную обоснованность заявленных свойств
-        2. Потенциальные побочные эффекты и противопоказания
-        3. Взаимодействие с другими препаратами
-        4. Эффективность по сравнению с аналогами
-        5. Рекомендации по применению
-        6. Альтернативные варианты
-        
-        Верни детальный анализ в структурированном виде.
-        """
+        context = get_prompt_context(description, composition)
+        prompt = context.render(AI_MODELS["deep_analysis"], DEEP_ANALYSIS_PROMPT)
         
         result = await call_ai_model(AI_MODELS["deep_analysis"], prompt)
         
@@ -341,6 +839,114 @@ async def perform_deep_analysis(description: str, composition: str) -> Dict[str,
             "error": f"Ошибка глубокого анализа: {str(e)}"
         }
 
+def estimate_tokens(text: str) -> int:
+    """Приблизительно оценивает число токенов в тексте.
+    
+    Латиница и цифры занимают около 4 символов на токен, кириллица и прочие
+    символы - около 2.
+    """
+    if not text:
+        return 0
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars) / 2)
+
+def compact_text(text: str, drop_marketing: bool = True) -> str:
+    """Удаляет повторы и, если drop_marketing, рекламные фразы, сохраняя порядок предложений"""
+    seen = set()
+    sentences = []
+    for sentence in SENTENCE_SPLIT_RE.split(text or ''):
+        sentence = REPEATED_PUNCTUATION_RE.sub(r'\1', ' '.join(sentence.split()))
+        if not sentence:
+            continue
+        fingerprint = re.sub(r'\W+', ' ', sentence.lower()).strip()
+        if not fingerprint or fingerprint in seen:
+            continue
+        if drop_marketing and len(sentence) <= MARKETING_SENTENCE_MAX_LENGTH and MARKETING_RE.search(sentence):
+            continue
+        seen.add(fingerprint)
+        sentences.append(sentence)
+    return ' '.join(sentences)
+
+def truncate_to_budget(text: str, budget: int) -> str:
+    """Обрезает текст по границам предложений, чтобы уложиться в бюджет токенов"""
+    if estimate_tokens(text) <= budget:
+        return text
+    if budget <= 0:
+        return ''
+    
+    kept = []
+    used = 0
+    for sentence in SENTENCE_SPLIT_RE.split(text):
+        cost = estimate_tokens(sentence) + 1
+        if used + cost > budget:
+            if not kept:
+                # Первое предложение длиннее бюджета - режем по последнему разделителю
+                cut = sentence[:max(budget - 1, 0) * 2]
+                boundary = max(cut.rfind(', '), cut.rfind(' '))
+                kept.append(cut[:boundary] if boundary > 0 else cut)
+            break
+        kept.append(sentence)
+        used += cost
+    return ' '.join(kept) + ' …'
+
+class PromptContext:
+    """Сжатый контекст товара, общий для базового, детального и глубокого промптов"""
+    def __init__(self, description: str, composition: str):
+        self.original_description = description
+        self.original_composition = composition
+        self.description = compact_text(description)
+        # В составе каждый фрагмент - ингредиент, поэтому рекламный фильтр к нему не применяется
+        self.composition = compact_text(composition, drop_marketing=False)
+        self.fields_cache: Dict[int, Tuple[str, str]] = {}
+    
+    def fields_for(self, model_name: str) -> Tuple[str, str]:
+        """Возвращает описание и состав, уложенные в бюджет модели.
+        
+        Состав важнее для вердикта, поэтому он получает до половины бюджета,
+        а описание - всё оставшееся.
+        """
+        budget = PROMPT_TOKEN_BUDGETS.get(model_name, DEFAULT_PROMPT_TOKEN_BUDGET)
+        if budget not in self.fields_cache:
+            composition = truncate_to_budget(self.composition, budget // 2)
+            description = truncate_to_budget(self.description, budget - estimate_tokens(composition))
+            self.fields_cache[budget] = (description, composition)
+        return self.fields_cache[budget]
+    
+    def render(self, model_name: str, template: str) -> str:
+        """Подставляет сжатый контекст в шаблон промпта"""
+        description, composition = self.fields_for(model_name)
+        return template.format(description=description, composition=composition)
+    
+    def savings(self, model_name: str, template: str) -> Dict[str, int]:
+        """Сравнивает размер промпта до и после сжатия"""
+        original = template.format(
+            description=self.original_description,
+            composition=self.original_composition
+        )
+        original_tokens = estimate_tokens(original)
+        compacted_tokens = estimate_tokens(self.render(model_name, template))
+        return {
+            "original_tokens": original_tokens,
+            "compacted_tokens": compacted_tokens,
+            "saved_tokens": original_tokens - compacted_tokens
+        }
+
+# Недавние контексты, чтобы deep_analysis переиспользовал сжатие из analyze_product
+prompt_contexts: "OrderedDict[str, PromptContext]" = OrderedDict()
+
+def get_prompt_context(description: str, composition: str) -> PromptContext:
+    """Возвращает сжатый контекст товара, создавая его при первом обращении"""
+    key = make_request_key('prompt_context', description, composition)
+    context = prompt_contexts.get(key)
+    if context is None:
+        context = PromptContext(description, composition)
+        prompt_contexts[key] = context
+        if len(prompt_contexts) > PROMPT_CONTEXT_CACHE_SIZE:
+            prompt_contexts.popitem(last=False)
+    else:
+        prompt_contexts.move_to_end(key)
+    return context
+
 async def analyze_composition_vs_description(description: str, composition: str) -> Dict[str, Any]:
     """Анализирует соответствие описания и состава с помощью нейросетей"""
     
@@ -353,41 +959,13 @@ async def analyze_composition_vs_description(description: str, composition: str)
     
     try:
         # Базовый анализ с помощью Gemini Flash
-        basic_prompt = f"""
-        Проанализируй соответствие описания товара и его состава.
-        
-        Описание: {description}
-        Состав: {composition}
-        
-        Оцени по шкале от 1 до 10, где:
-        1 - полное несоответствие
-        10 - полное соответствие
-        
-        Верни JSON в формате:
-        {{
-            "score": число,
-            "reasoning": "объяснение оценки",
-            "details": ["деталь 1", "деталь 2"]
-        }}
-        """
+        context = get_prompt_context(description, composition)
+        basic_prompt = context.render(AI_MODELS["basic_analysis"], BASIC_ANALYSIS_PROMPT)
         
         basic_result = await call_ai_model(AI_MODELS["basic_analysis"], basic_prompt)
         
         # Детальное сравнение с помощью Gemini Pro
-        detailed_prompt = f"""
-        Проведи детальный анализ соответствия описания и состава товара.
-        
-        Описание: {description}
-        Состав: {composition}
-        
-        Проанализируй:
-        1. Соответствие заявленных свойств составу
-        2. Качество и полезность ингредиентов
-        3. Потенциальные риски или преимущества
-        4. Рекомендации по использованию
-        
-        Верни структурированный анализ.
-        """
+        detailed_prompt = context.render(AI_MODELS["detailed_comparison"], DETAILED_COMPARISON_PROMPT)
         
         detailed_result = await call_ai_model(AI_MODELS["detailed_comparison"], detailed_prompt)
         
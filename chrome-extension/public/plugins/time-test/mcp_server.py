@@ -1,34 +1,240 @@
 import sys
 import json
 import asyncio
+import hashlib
+import math
 # import aiohttp  # Не доступен в Pyodide
-from typing import Any, Dict
-from datetime import datetime
+from bisect import bisect_right
+from functools import lru_cache
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import time
 
-async def main():
-    """Основная функция MCP сервера для тестового плагина времени"""
-    try:
+try:
+    # В Pyodide база часовых поясов поставляется пакетом tzdata
+    import tzdata  # noqa: F401
+except ImportError:
+    pass
+
+# Сколько часовых поясов держать загруженными
+ZONE_CACHE_SIZE = 64
+
+# Диапазон лет, для которого строятся таблицы переходов зоны (по году
+# при первом обращении); за его пределами смещение вычисляется через ZoneInfo
+TRANSITION_TABLE_YEARS = (1970, 2040)
+
+# Шаг поиска переходов; более частые смены смещения в tzdata не встречаются
+TRANSITION_SCAN_STEP = timedelta(days=1)
+
+UTC_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# Начала лет TRANSITION_TABLE_YEARS в секундах эпохи, по ним находится год timestamp
+YEAR_STARTS = [
+    int((datetime(year, 1, 1, tzinfo=dt_timezone.utc) - UTC_EPOCH).total_seconds())
+    for year in range(TRANSITION_TABLE_YEARS[0], TRANSITION_TABLE_YEARS[1] + 1)
+]
+
+# Допустимые timestamp: с запасом на смещение зоны внутри диапазона datetime
+MIN_TIMESTAMP = (datetime(1, 1, 2, tzinfo=dt_timezone.utc) - UTC_EPOCH).total_seconds()
+MAX_TIMESTAMP = (datetime(9999, 12, 30, tzinfo=dt_timezone.utc) - UTC_EPOCH).total_seconds()
+
+# Сколько секунд может выполняться запрос, прежде чем watchdog его отменит
+REQUEST_TIMEOUT_SECONDS = 30
+
+# --- mcp-server-loop: begin (копия python-host/server_loop.py, правьте там и запускайте sync_server_loop.py) ---
+class McpServerLoop:
+    """Цикл MCP-сервера поверх stdio, изолирующий ошибки отдельных запросов.
+
+    Каждая строка stdin обрабатывается своей задачей, поэтому долгий или
+    зависший обработчик не задерживает остальные запросы. Watchdog отменяет
+    обработчик, не ответивший за timeout секунд, и отвечает ошибкой; повторно
+    запрос не запускается, так как обработчики не идемпотентны (вызовы моделей).
+
+    В карантин попадает только детерминированное падение: запрос, который
+    poison_threshold раз подряд роняет обработчик с одной и той же ошибкой.
+    Карантин и счетчики падений истекают через quarantine_ttl секунд.
+
+    cold_starts_avoided считает ошибки разбора и падения обработчика, которые
+    раньше роняли процесс и вынуждали заново запускать сервер. Таймауты и
+    отказы карантина сюда не входят: сервер на них и раньше не падал.
+    """
+
+    # Под этим именем учитываются ответы на нераспознанные сообщения
+    INVALID_METHOD = '<invalid>'
+
+    def __init__(self, process_request: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                 timeout: float = 30.0, poison_threshold: int = 2,
+                 quarantine_ttl: float = 300.0, quarantine_size: int = 128):
+        self.process_request = process_request
+        self.timeout = timeout
+        self.poison_threshold = poison_threshold
+        self.quarantine_ttl = quarantine_ttl
+        self.quarantine_size = quarantine_size
+        self.stats = {
+            "requests": 0,
+            "errors": 0,
+            "timeouts": 0,
+            "quarantined": 0,
+            "quarantine_hits": 0,
+            "cold_starts_avoided": 0
+        }
+        # Ключ сообщения -> (ошибка, число падений подряд, когда истекает)
+        self.failures: "OrderedDict[str, Tuple[str, int, float]]" = OrderedDict()
+        # Ключ сообщения -> (причина, когда истекает)
+        self.quarantine: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        # Размер ответов и время их кодирования по методам
+        self.response_stats: Dict[str, Dict[str, float]] = {}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Счетчики цикла для метода server_stats"""
+        self.expire(time.monotonic())
+        return dict(
+            self.stats,
+            quarantine_size=len(self.quarantine),
+            responses={method: dict(stats) for method, stats in self.response_stats.items()}
+        )
+
+    async def serve(self):
+        """Читает запросы из stdin и пишет ответы в stdout до конца ввода"""
+        # Ответы пишутся в UTF-8 без экранирования, независимо от локали процесса
+        if hasattr(sys.stdout, 'reconfigure'):
+            sys.stdout.reconfigure(encoding='utf-8')
+
+        loop = asyncio.get_running_loop()
+        pending = set()
         while True:
-            line = sys.stdin.readline()
+            # stdin читается в отдельном потоке, чтобы запросы выполнялись, пока ждем следующую строку
+            line = await loop.run_in_executor(None, sys.stdin.readline)
             if not line:
                 break
-                
+            if not line.strip():
+                continue
+            # Ответы могут прийти не в порядке запросов, их сопоставляют по id
+            task = asyncio.ensure_future(self.respond(line))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+        if pending:
+            await asyncio.gather(*pending)
+
+    async def respond(self, line: str):
+        """Обрабатывает строку запроса и пишет ответ в stdout одной записью"""
+        sys.stdout.write(await self.handle_message(line) + '\n')
+        sys.stdout.flush()
+
+    async def handle_message(self, line: str) -> str:
+        """Обрабатывает строку запроса и возвращает закодированный ответ"""
+        method, response = await self.dispatch_message(line)
+        started = time.perf_counter()
+        # Кириллица без \uXXXX-экранирования занимает вдвое-втрое меньше
+        encoded = json.dumps(response, ensure_ascii=False, separators=(',', ':'))
+        self.record_response(method, len(encoded.encode('utf-8')), time.perf_counter() - started)
+        return encoded
+
+    def record_response(self, method: str, size: int, seconds: float):
+        """Учитывает размер и время кодирования ответа метода"""
+        stats = self.response_stats.setdefault(method, {"calls": 0, "bytes": 0, "max_bytes": 0, "encode_ms": 0.0})
+        stats["calls"] += 1
+        stats["bytes"] += size
+        stats["max_bytes"] = max(stats["max_bytes"], size)
+        stats["encode_ms"] += seconds * 1000
+
+    async def dispatch_message(self, line: str) -> Tuple[str, Dict[str, Any]]:
+        """Обрабатывает одну строку запроса, не давая ошибке остановить сервер.
+
+        Возвращает метод запроса и ответ.
+        """
+        self.stats["requests"] += 1
+
+        try:
             request = json.loads(line)
-            response = await process_request(request)
-            
-            sys.stdout.write(json.dumps(response) + '\n')
-            sys.stdout.flush()
-            
-    except Exception as e:
-        error_response = {
+        except json.JSONDecodeError as e:
+            self.stats["errors"] += 1
+            self.stats["cold_starts_avoided"] += 1
+            return self.INVALID_METHOD, self.error(-32700, f"Parse error: {str(e)}")
+
+        if not isinstance(request, dict):
+            self.stats["errors"] += 1
+            self.stats["cold_starts_avoided"] += 1
+            return self.INVALID_METHOD, self.error(-32600, "Invalid request: ожидался JSON-объект")
+
+        method = str(request.get('method'))
+        key = self.message_key(request)
+        now = time.monotonic()
+        self.expire(now)
+        if key in self.quarantine:
+            self.stats["quarantine_hits"] += 1
+            reason, _expires = self.quarantine[key]
+            return method, self.with_request_id(request, self.error(-32001, f"Запрос помещен в карантин: {reason}"))
+
+        try:
+            response = await asyncio.wait_for(self.process_request(request), self.timeout)
+        except asyncio.TimeoutError:
+            # Зависание может быть временным (сеть, лимиты модели), поэтому без карантина
+            self.stats["errors"] += 1
+            self.stats["timeouts"] += 1
+            return method, self.with_request_id(
+                request, self.error(-32603, f"Internal error: обработчик не ответил за {self.timeout:g} с"))
+        except Exception as e:
+            self.stats["errors"] += 1
+            self.stats["cold_starts_avoided"] += 1
+            failure = f"{type(e).__name__}: {str(e)}"
+            self.remember_failure(key, failure, now)
+            return method, self.with_request_id(request, self.error(-32603, f"Internal error: {failure}"))
+
+        self.failures.pop(key, None)
+        return method, self.with_request_id(request, response)
+
+    def remember_failure(self, key: str, failure: str, now: float):
+        """Считает падения подряд с одной ошибкой и помещает такое сообщение в карантин"""
+        previous = self.failures.pop(key, None)
+        count = previous[1] + 1 if previous and previous[0] == failure else 1
+        if count < self.poison_threshold:
+            self.bounded_put(self.failures, key, (failure, count, now + self.quarantine_ttl))
+            return
+        self.bounded_put(self.quarantine, key, (failure, now + self.quarantine_ttl))
+        self.stats["quarantined"] += 1
+
+    def expire(self, now: float):
+        """Удаляет истекшие записи карантина и счетчиков падений"""
+        for entries in (self.quarantine, self.failures):
+            for key in [key for key, entry in entries.items() if entry[-1] <= now]:
+                del entries[key]
+
+    def bounded_put(self, entries: "OrderedDict[str, Any]", key: str, value: Any):
+        """Добавляет запись, вытесняя самую старую при переполнении"""
+        entries[key] = value
+        while len(entries) > self.quarantine_size:
+            entries.popitem(last=False)
+
+    @staticmethod
+    def message_key(request: Dict[str, Any]) -> str:
+        """Ключ сообщения без учета ID, чтобы повторы одного запроса совпадали"""
+        body = json.dumps([request.get('method'), request.get('params')], sort_keys=True, default=str)
+        return hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def with_request_id(request: Dict[str, Any], response: Dict[str, Any]) -> Dict[str, Any]:
+        """Добавляет ID запроса к ответу"""
+        if 'id' in request:
+            response['id'] = request['id']
+        return response
+
+    @staticmethod
+    def error(code: int, message: str) -> Dict[str, Any]:
+        return {
             "error": {
-                "code": -32603,
-                "message": f"Internal error: {str(e)}"
+                "code": code,
+                "message": message
             }
         }
-        sys.stdout.write(json.dumps(error_response) + '\n')
-        sys.stdout.flush()
+# --- mcp-server-loop: end ---
+
+async def main():
+    """Основная функция MCP сервера для тестового плагина времени"""
+    await server_loop.serve()
 
 async def process_request(request: Dict[str, Any]) -> Dict[str, Any]:
     """Обработка MCP запросов"""
@@ -37,8 +243,12 @@ async def process_request(request: Dict[str, Any]) -> Dict[str, Any]:
     
     if method == 'get_time':
         return await get_current_time(params)
+    elif method == 'get_times':
+        return await get_times(params)
     elif method == 'ping':
         return {"result": "pong"}
+    elif method == 'server_stats':
+        return {"result": server_loop.snapshot()}
     else:
         return {
             "error": {
@@ -47,22 +257,162 @@ async def process_request(request: Dict[str, Any]) -> Dict[str, Any]:
             }
         }
 
+server_loop = McpServerLoop(process_request, timeout=REQUEST_TIMEOUT_SECONDS)
+
+class ZoneTable:
+    """Таблица переходов часового пояса.
+    
+    Хранит UTC-моменты, с которых действует новое смещение, чтобы переводить
+    время двоичным поиском без обращений к ZoneInfo на каждый timestamp.
+    Переходы ищутся отдельно для каждого года при первом обращении к нему,
+    поэтому текущее время требует просмотра только текущего года.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.zone = ZoneInfo(name)
+        # Индекс года в YEAR_STARTS -> (начала периодов, периоды)
+        self.years: Dict[int, Tuple[List[int], List[Tuple[int, str, bool]]]] = {}
+    
+    def scan_year(self, year_index: int) -> Tuple[List[int], List[Tuple[int, str, bool]]]:
+        """Строит таблицу переходов одного года"""
+        start = UTC_EPOCH + timedelta(seconds=YEAR_STARTS[year_index])
+        end = UTC_EPOCH + timedelta(seconds=YEAR_STARTS[year_index + 1])
+        starts: List[int] = [YEAR_STARTS[year_index]]
+        periods: List[Tuple[int, str, bool]] = [self.describe(start)]
+        moment = start
+        while moment < end:
+            following = min(moment + TRANSITION_SCAN_STEP, end)
+            if self.describe(following) != periods[-1]:
+                transition = self.find_transition(moment, following)
+                # Переход ровно в начале следующего года относится уже к нему
+                if transition < YEAR_STARTS[year_index + 1]:
+                    starts.append(transition)
+                    periods.append(self.describe(UTC_EPOCH + timedelta(seconds=transition)))
+            moment = following
+        self.years[year_index] = (starts, periods)
+        return starts, periods
+    
+    def describe(self, moment: datetime) -> Tuple[int, str, bool]:
+        """Смещение в секундах, аббревиатура и признак летнего времени в момент UTC"""
+        local = moment.astimezone(self.zone)
+        return (
+            int(local.utcoffset().total_seconds()),
+            local.tzname() or '',
+            bool(local.dst())
+        )
+    
+    def find_transition(self, before: datetime, after: datetime) -> int:
+        """Находит с точностью до секунды момент смены периода между двумя точками"""
+        low = int((before - UTC_EPOCH).total_seconds())
+        high = int((after - UTC_EPOCH).total_seconds())
+        period = self.describe(before)
+        while high - low > 1:
+            middle = (low + high) // 2
+            if self.describe(UTC_EPOCH + timedelta(seconds=middle)) == period:
+                low = middle
+            else:
+                high = middle
+        return high
+    
+    def period_at(self, timestamp: float) -> Tuple[int, str, bool]:
+        year_index = bisect_right(YEAR_STARTS, timestamp) - 1
+        if 0 <= year_index < len(YEAR_STARTS) - 1:
+            starts, periods = self.years.get(year_index) or self.scan_year(year_index)
+            return periods[bisect_right(starts, timestamp) - 1]
+        return self.describe(UTC_EPOCH + timedelta(seconds=timestamp))
+    
+    def convert(self, timestamp: float) -> Tuple[datetime, int, str, bool]:
+        """Переводит UTC timestamp в местное время зоны"""
+        offset, abbreviation, dst = self.period_at(timestamp)
+        local = UTC_EPOCH + timedelta(seconds=timestamp + offset)
+        return local.replace(tzinfo=fixed_offset(offset)), offset, abbreviation, dst
+
+@lru_cache(maxsize=ZONE_CACHE_SIZE)
+def get_zone_table(name: str) -> ZoneTable:
+    """Возвращает таблицу зоны, строя ее при первом обращении (LRU)"""
+    return ZoneTable(name)
+
+@lru_cache(maxsize=None)
+def fixed_offset(offset: int) -> dt_timezone:
+    return dt_timezone(timedelta(seconds=offset))
+
+def format_offset(offset: int) -> str:
+    sign = '-' if offset < 0 else '+'
+    hours, remainder = divmod(abs(offset), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if seconds:
+        # Местное среднее время до введения поясов имеет смещение с секундами
+        return f"{sign}{hours:02d}:{minutes:02d}:{seconds:02d}"
+    return f"{sign}{hours:02d}:{minutes:02d}"
+
+def parse_timestamp(value: Any) -> float:
+    """Принимает секунды с начала эпохи или ISO-строку; время без пояса считается UTC"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        # NaN, бесконечность и огромные числа не переводятся в datetime
+        if not (math.isfinite(value) and MIN_TIMESTAMP <= value <= MAX_TIMESTAMP):
+            raise ValueError(f"timestamp вне допустимого диапазона: {value!r}")
+        return float(value)
+    if isinstance(value, str):
+        moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=dt_timezone.utc)
+        return parse_timestamp((moment - UTC_EPOCH).total_seconds())
+    raise ValueError(f"Неверный timestamp: {value!r}")
+
+def invalid_params(message: str) -> Dict[str, Any]:
+    return {
+        "error": {
+            "code": -32602,
+            "message": message
+        }
+    }
+
+def tz_database_available() -> bool:
+    """Есть ли база часовых поясов: системная или из пакета tzdata"""
+    try:
+        ZoneInfo('Etc/UTC')
+    except ZoneInfoNotFoundError:
+        return False
+    return True
+
+def unknown_zone_error(timezone: str) -> Dict[str, Any]:
+    """Ошибка для зоны, которую не удалось загрузить.
+
+    Без базы часовых поясов не загружается ни одна зона; это ошибка среды,
+    а не параметров запроса.
+    """
+    if not tz_database_available():
+        return {
+            "error": {
+                "code": -32603,
+                "message": "Internal error: база часовых поясов недоступна (не загружен пакет tzdata)"
+            }
+        }
+    return invalid_params(f"Неизвестный часовой пояс: {timezone}")
+
 async def get_current_time(params: Dict[str, Any]) -> Dict[str, Any]:
-    """Получение текущего времени (локальное)"""
+    """Получение текущего времени в запрошенном часовом поясе (без сети)"""
+    timezone = params.get('timezone', 'Europe/Moscow')
+    if not isinstance(timezone, str):
+        return invalid_params("timezone должен быть строкой")
     try:
-        timezone = params.get('timezone', 'Europe/Moscow')
-        
-        # Используем локальное время вместо сетевого запроса
-        current_time = datetime.now()
+        table = get_zone_table(timezone)
+    except (ZoneInfoNotFoundError, ValueError):
+        return unknown_zone_error(timezone)
+    
+    try:
+        current_time, offset, abbreviation, dst = table.convert(time.time())
         
         return {
             "result": {
                 "datetime": current_time.isoformat(),
                 "timezone": timezone,
-                "utc_offset": "+03:00",  # Примерное значение для Москвы
+                "utc_offset": format_offset(offset),
+                "abbreviation": abbreviation,
+                "dst": dst,
                 "day_of_week": current_time.strftime("%A"),
-                "message": f"Локальное время: {current_time.strftime('%Y-%m-%d %H:%M:%S')}",
-                "note": "Используется локальное время (сетевые запросы недоступны в Pyodide)"
+                "message": f"Время в {timezone}: {current_time.strftime('%Y-%m-%d %H:%M:%S')}",
+                "note": "Используется локальная база часовых поясов (сетевые запросы не нужны)"
             }
         }
     except Exception as e:
@@ -73,5 +423,55 @@ async def get_current_time(params: Dict[str, Any]) -> Dict[str, Any]:
             }
         }
 
+async def get_times(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Переводит набор моментов времени сразу во все запрошенные часовые пояса.
+    
+    Параметры: timestamps - секунды эпохи или ISO-строки (по умолчанию текущий
+    момент), timezones - имена зон IANA. Результат по каждой зоне возвращается
+    столбцами, в порядке timestamps.
+    """
+    timezones = params.get('timezones') or [params.get('timezone', 'Europe/Moscow')]
+    if not isinstance(timezones, list) or not all(isinstance(timezone, str) for timezone in timezones):
+        return invalid_params("timezones должен быть списком имен часовых поясов")
+    values = params.get('timestamps') or [time.time()]
+    if not isinstance(values, list):
+        return invalid_params("timestamps должен быть списком")
+    try:
+        timestamps = [parse_timestamp(value) for value in values]
+    except ValueError as e:
+        return invalid_params(str(e))
+    
+    results = {}
+    for timezone in timezones:
+        try:
+            table = get_zone_table(timezone)
+        except (ZoneInfoNotFoundError, ValueError):
+            error = unknown_zone_error(timezone)
+            if error["error"]["code"] != -32602:
+                return error
+            results[timezone] = {"error": error["error"]["message"]}
+            continue
+        
+        datetimes = []
+        offsets = []
+        abbreviations = []
+        for timestamp in timestamps:
+            local, offset, abbreviation, _dst = table.convert(timestamp)
+            datetimes.append(local.isoformat())
+            offsets.append(format_offset(offset))
+            abbreviations.append(abbreviation)
+        results[timezone] = {
+            "datetimes": datetimes,
+            "utc_offsets": offsets,
+            "abbreviations": abbreviations
+        }
+    
+    return {
+        "result": {
+            "count": len(timestamps),
+            "timezones": results
+        }
+    }
+
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
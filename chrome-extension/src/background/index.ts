@@ -2,6 +2,7 @@ import 'webextension-polyfill';
 import { exampleThemeStorage } from '@extension/storage';
 import { getAvailablePlugins, getPluginManifest } from './plugin-manager';
 import { runWorkflow } from './workflow-engine';
+import { prewarmPlugins } from './mcp-bridge';
 import { hostApi } from './host-api';
 
 // Только стандартное поведение: панель открывается/закрывается глобально по клику на иконку
@@ -15,7 +16,14 @@ chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
   }
   
   if (message.type === 'GET_PLUGINS') {
-    getAvailablePlugins().then(sendResponse);
+    getAvailablePlugins().then(plugins => {
+      sendResponse(plugins);
+      // Only the side panel asks for prewarm: a plugin run is likely to follow there,
+      // while the options page just lists plugins and should not start Pyodide
+      if (message.prewarm) {
+        prewarmPlugins(plugins.map(plugin => plugin.id));
+      }
+    });
     return true;
   }
   
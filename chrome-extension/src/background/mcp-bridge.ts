@@ -4,6 +4,8 @@
  * Implements bidirectional communication for Python -> Host calls
  */
 
+import { pluginUsageStorage } from '@extension/storage';
+import { getRegistryEntry } from './plugin-manager';
 import { getWorker } from './worker-manager';
 
 interface WorkerMessage {
@@ -11,6 +13,9 @@ interface WorkerMessage {
   callId?: string;
   result?: any;
   error?: string;
+  code?: number;
+  retryAfterMs?: number;
+  metrics?: { convertMs: number; resultBytes: number };
   func?: string;
   args?: any[];
   status?: string;
@@ -20,17 +25,54 @@ interface WorkerMessage {
 interface PromiseResolver {
   resolve: (value: any) => void;
   reject: (error: Error) => void;
+  // The original request, resent when the worker answers "overloaded"
+  request: Record<string, any>;
+  attempts: number;
+}
+
+// Must match OVERLOADED_ERROR_CODE in pyodide-worker.js
+const OVERLOADED_ERROR_CODE = -32002;
+const MAX_OVERLOAD_RETRIES = 5;
+const BASE_RETRY_DELAY_MS = 250;
+
+// How many of the most used plugins are loaded into the worker ahead of the first call
+const PREWARM_PLUGIN_COUNT = 2;
+
+interface ToolMetrics {
+  calls: number;
+  resultBytes: number;
+  maxResultBytes: number;
+  convertMs: number;
 }
 
 let isWorkerInitialized = false;
 const promises = new Map<string, PromiseResolver>();
+// Plugin sources are fetched again only when their hash in plugins/registry.json changes;
+// the worker keeps the loaded plugin between calls
+const pluginSources = new Map<string, { serverHash: string | null; source: Promise<string> }>();
+// Result size and toJs conversion time per plugin tool, as reported by the worker
+const toolMetrics = new Map<string, ToolMetrics>();
+
+function recordToolMetrics(request: Record<string, any>, metrics: { convertMs: number; resultBytes: number }) {
+  const key = `${request.pluginId}/${request.toolName}`;
+  const entry = toolMetrics.get(key) ?? { calls: 0, resultBytes: 0, maxResultBytes: 0, convertMs: 0 };
+  entry.calls += 1;
+  entry.resultBytes += metrics.resultBytes;
+  entry.maxResultBytes = Math.max(entry.maxResultBytes, metrics.resultBytes);
+  entry.convertMs += metrics.convertMs;
+  toolMetrics.set(key, entry);
+}
+
+export function getToolMetrics(): Record<string, ToolMetrics> {
+  return Object.fromEntries(toolMetrics);
+}
 
 function initializeCommunication() {
   if (isWorkerInitialized) return;
   const pyodideWorker = getWorker();
 
   pyodideWorker.onmessage = (event: MessageEvent<WorkerMessage>) => {
-    const { type, callId, result, error, func, args, status, message } = event.data;
+    const { type, callId, result, error, code, retryAfterMs, metrics, func, args, status, message } = event.data;
 
     if (type === 'pyodide_status') {
       // Handle status messages from Pyodide
@@ -56,6 +98,16 @@ function initializeCommunication() {
     } else if (type === 'complete' || type === 'error') {
       const promise = promises.get(callId!);
       if (promise) {
+        if (type === 'error' && code === OVERLOADED_ERROR_CODE && promise.attempts < MAX_OVERLOAD_RETRIES) {
+          // The worker sheds load instead of queueing without bound: back off and resend,
+          // waiting at least as long as the worker asked
+          promise.attempts += 1;
+          const backoffMs = BASE_RETRY_DELAY_MS * 2 ** (promise.attempts - 1);
+          const delayMs = Math.max(retryAfterMs ?? 0, backoffMs) * (1 + Math.random() * 0.2);
+          setTimeout(() => getWorker().postMessage(promise.request), delayMs);
+          return;
+        }
+        if (metrics) recordToolMetrics(promise.request, metrics);
         if (type === 'complete') promise.resolve(result);
         else promise.reject(new Error(error));
         promises.delete(callId!);
@@ -65,24 +117,63 @@ function initializeCommunication() {
   isWorkerInitialized = true;
 }
 
+async function getPluginSource(pluginId: string): Promise<string> {
+  const entry = await getRegistryEntry(pluginId);
+  const serverHash = entry?.server_sha256 ?? null;
+  let cached = pluginSources.get(pluginId);
+  if (!cached || cached.serverHash !== serverHash) {
+    const source = (async () => {
+      const pyScriptUrl = chrome.runtime.getURL(`plugins/${pluginId}/${entry?.main_server ?? 'mcp_server.py'}`);
+      const response = await fetch(pyScriptUrl);
+      if (!response.ok) throw new Error(`Python script для плагина ${pluginId} не найден`);
+      return response.text();
+    })();
+    const current = { serverHash, source };
+    // Failed fetches are not cached so the next call can retry
+    source.catch(() => {
+      if (pluginSources.get(pluginId) === current) pluginSources.delete(pluginId);
+    });
+    pluginSources.set(pluginId, current);
+    cached = current;
+  }
+  return cached.source;
+}
+
+/**
+ * Loads the most used of the given plugins into the worker ahead of their first call
+ */
+export async function prewarmPlugins(pluginIds: string[]): Promise<void> {
+  try {
+    const mostUsed = await pluginUsageStorage.getMostUsed(pluginIds, PREWARM_PLUGIN_COUNT);
+    if (mostUsed.length === 0) return;
+    initializeCommunication();
+    const plugins = await Promise.all(
+      mostUsed.map(async pluginId => ({ pluginId, pythonCode: await getPluginSource(pluginId) })),
+    );
+    getWorker().postMessage({ type: 'prewarm_plugins', plugins });
+  } catch (error) {
+    console.warn('[MCP Bridge] Plugin pre-warm failed:', error);
+  }
+}
+
 export async function runPythonTool(pluginId: string, toolName: string, toolInput: any): Promise<any> {
   initializeCommunication();
   const pyodideWorker = getWorker();
   const callId = `py_tool_run_${Date.now()}_${Math.random()}`;
   
-  const pyScriptUrl = chrome.runtime.getURL(`plugins/${pluginId}/mcp_server.py`);
-  const response = await fetch(pyScriptUrl);
-  if (!response.ok) throw new Error(`Python script для плагина ${pluginId} не найден`);
-  const pythonCode = await response.text();
+  const pythonCode = await getPluginSource(pluginId);
+  pluginUsageStorage.recordUse(pluginId).catch(error => console.warn('[MCP Bridge] Failed to record plugin usage:', error));
 
   return new Promise((resolve, reject) => {
-    promises.set(callId, { resolve, reject });
-    pyodideWorker.postMessage({
+    const request = {
       type: 'run_python_tool', 
       callId, 
+      pluginId,
       pythonCode, 
       toolName, 
       toolInput
-    });
+    };
+    promises.set(callId, { resolve, reject, request, attempts: 0 });
+    pyodideWorker.postMessage(request);
   });
 } 
\ No newline at end of file
@@ -23,41 +23,132 @@ export interface Plugin {
   manifest: PluginManifest;
 }
 
+// Used only when plugins/registry.json has not been generated
 const PLUGIN_DIRS = ['ozon-analyzer', 'google-helper', 'test-plugin', 'time-test'];
 
-export async function getAvailablePlugins(): Promise<Plugin[]> {
-  const plugins: Plugin[] = [];
-  
-  for (const dirName of PLUGIN_DIRS) {
-    try {
-      const manifestUrl = chrome.runtime.getURL(`plugins/${dirName}/manifest.json`);
-      const response = await fetch(manifestUrl);
-
-      if (!response.ok) {
-        throw new Error(`Failed to fetch manifest: ${response.statusText}`);
-      }
-
-      const manifest: PluginManifest = await response.json();
-      
-      plugins.push({
-        id: dirName,
-        name: manifest.name,
-        version: manifest.version,
-        description: manifest.description,
-        icon: manifest.icon,
-        iconUrl: chrome.runtime.getURL(`plugins/${dirName}/${manifest.icon || 'icon.svg'}`),
-        manifest
-      });
-
-    } catch (error) {
-      console.error(`Failed to load plugin from '${dirName}':`, error);
-    }
+const REQUIRED_MANIFEST_FIELDS = ['name', 'version', 'description', 'main_server'] as const;
+
+/**
+ * Entry of plugins/registry.json, generated by python-host/build_registry.py
+ */
+export interface RegistryEntry {
+  manifest_sha256: string;
+  main_server: string;
+  server_sha256: string;
+}
+
+interface RegistryIndex {
+  hash: string;
+  plugins: Record<string, RegistryEntry>;
+}
+
+interface RegistryState {
+  // False until every plugin has loaded once, so failed plugins are retried
+  complete: boolean;
+  hash: string | null;
+  entries: Record<string, RegistryEntry>;
+  plugins: Map<string, { manifestHash: string | null; plugin: Plugin }>;
+}
+
+// In-memory registry. It is rebuilt only when the index hash changes, and then only
+// the plugins whose manifest hash changed are fetched again.
+let registry: RegistryState = { complete: false, hash: null, entries: {}, plugins: new Map() };
+let registryUpdate: Promise<RegistryState> | null = null;
+
+async function fetchRegistryIndex(): Promise<RegistryIndex | null> {
+  try {
+    const response = await fetch(chrome.runtime.getURL('plugins/registry.json'), { cache: 'no-cache' });
+    return response.ok ? await response.json() : null;
+  } catch (error) {
+    return null;
   }
-  
-  return plugins;
+}
+
+function validateManifest(dirName: string, manifest: any): PluginManifest {
+  if (!manifest || typeof manifest !== 'object') {
+    throw new Error(`Manifest of '${dirName}' is not a JSON object`);
+  }
+  const missing = REQUIRED_MANIFEST_FIELDS.filter(field => typeof manifest[field] !== 'string');
+  if (missing.length > 0) {
+    throw new Error(`Manifest of '${dirName}' is missing required fields: ${missing.join(', ')}`);
+  }
+  return manifest as PluginManifest;
+}
+
+async function loadPlugin(dirName: string): Promise<Plugin> {
+  const manifestUrl = chrome.runtime.getURL(`plugins/${dirName}/manifest.json`);
+  const response = await fetch(manifestUrl);
+
+  if (!response.ok) {
+    throw new Error(`Failed to fetch manifest: ${response.statusText}`);
+  }
+
+  const manifest = validateManifest(dirName, await response.json());
+  return {
+    id: dirName,
+    name: manifest.name,
+    version: manifest.version,
+    description: manifest.description,
+    icon: manifest.icon,
+    iconUrl: chrome.runtime.getURL(`plugins/${dirName}/${manifest.icon || 'icon.svg'}`),
+    manifest
+  };
+}
+
+async function updateRegistry(): Promise<RegistryState> {
+  const index = await fetchRegistryIndex();
+  const hash = index?.hash ?? null;
+  if (registry.complete && hash === registry.hash) return registry;
+
+  const dirNames = index ? Object.keys(index.plugins) : PLUGIN_DIRS;
+  // Manifests are fetched in parallel; a broken plugin does not hide the others
+  const results = await Promise.allSettled(
+    dirNames.map(async dirName => {
+      const manifestHash = index?.plugins[dirName].manifest_sha256 ?? null;
+      const cached = registry.plugins.get(dirName);
+      if (cached && cached.manifestHash === manifestHash) return cached;
+      return { manifestHash, plugin: await loadPlugin(dirName) };
+    }),
+  );
+
+  const plugins = new Map<string, { manifestHash: string | null; plugin: Plugin }>();
+  results.forEach((result, i) => {
+    if (result.status === 'fulfilled') plugins.set(dirNames[i], result.value);
+    else console.error(`Failed to load plugin from '${dirNames[i]}':`, result.reason);
+  });
+
+  // Without a generated index the registry is kept until a plugin fails to load
+  registry = { complete: plugins.size === dirNames.length, hash, entries: index?.plugins ?? {}, plugins };
+  return registry;
+}
+
+function getRegistry(): Promise<RegistryState> {
+  // Concurrent callers share one update
+  if (!registryUpdate) {
+    registryUpdate = updateRegistry().finally(() => {
+      registryUpdate = null;
+    });
+  }
+  return registryUpdate;
+}
+
+export async function getAvailablePlugins(): Promise<Plugin[]> {
+  const { plugins } = await getRegistry();
+  return Array.from(plugins.values(), ({ plugin }) => plugin);
+}
+
+/**
+ * Registry entry with the server file hash, or null when the index has not been generated
+ */
+export async function getRegistryEntry(pluginId: string): Promise<RegistryEntry | null> {
+  const { entries } = await getRegistry();
+  return entries[pluginId] ?? null;
 }
 
 export async function getPluginManifest(pluginId: string): Promise<PluginManifest | null> {
+  const cached = (await getRegistry()).plugins.get(pluginId);
+  if (cached) return cached.plugin.manifest;
+
   try {
     const manifestUrl = chrome.runtime.getURL(`plugins/${pluginId}/manifest.json`);
     const response = await fetch(manifestUrl);
@@ -1,30 +1,224 @@
 /**
  * Pyodide Worker for Agent-Plugins-Platform
  * Handles async Python functions in Web Worker
+ *
+ * Startup is accelerated in two ways:
+ * - plugins are loaded from precompiled bytecode bundles (python-host/build_bundles.py)
+ *   when they are available and match the Pyodide Python version;
+ * - after a cold start with bundles, a Pyodide memory snapshot is stored in Cache Storage
+ *   and later workers restore from it instead of re-initializing Python.
  */
 importScripts('../public/pyodide/pyodide.js');
 
+const PYODIDE_INDEX_URL = '../public/pyodide/';
+const PLUGINS_BASE_URL = new URL('/plugins/', self.location.origin).href;
+const SNAPSHOT_CACHE_NAME = 'app-pyodide-snapshots';
+// Cache Storage only accepts http(s) request URLs, so snapshots are keyed by a synthetic
+// URL on a reserved domain instead of the chrome-extension:// origin
+const SNAPSHOT_KEY_BASE = 'https://app-pyodide-snapshot.invalid/';
+
+// Admission control. Every admitted call converts its input into the Pyodide heap,
+// so only MAX_ACTIVE_CALLS run at once and up to MAX_PENDING_CALLS more wait in a queue.
+// MAX_PENDING_BYTES bounds the inputs of running and waiting calls together. A call that
+// does not fit is rejected right away as overloaded with a retry-after hint, which
+// mcp-bridge.ts honors by backing off and retrying.
+const MAX_ACTIVE_CALLS = 4;
+const MAX_PENDING_CALLS = 16;
+const MAX_PENDING_BYTES = 64 * 1024 * 1024;
+const OVERLOADED_ERROR_CODE = -32002;
+const MIN_RETRY_AFTER_MS = 250;
+
+// Python side of plugin loading. Each plugin runs in its own namespace,
+// so plugins no longer overwrite each other's globals, and the namespace
+// is reused between calls while the source is unchanged.
+const PLUGIN_LOADER = `
+import hashlib
+import importlib.util
+import json
+import marshal
+import zipfile
+
+_app_plugin_namespaces = {}
+
+def _app_load_plugin(plugin_id, source=None, bundle_path=None):
+    code = None
+    main_server = 'mcp_server.py'
+    if bundle_path is not None:
+        with zipfile.ZipFile(bundle_path) as archive:
+            meta = json.loads(archive.read('bundle.json'))
+            main_server = meta['main_server']
+            bundle_source = archive.read(main_server).decode('utf-8')
+            if source is None or source == bundle_source:
+                source = bundle_source
+                pyc = archive.read('mcp_server.pyc')
+                if pyc[:4] == importlib.util.MAGIC_NUMBER:
+                    code = marshal.loads(pyc[4:])
+
+    source_hash = hashlib.sha256(source.encode('utf-8')).hexdigest()
+    namespace = _app_plugin_namespaces.get(plugin_id)
+    if namespace is not None and namespace['__app_source_hash__'] == source_hash:
+        return namespace
+
+    if code is None:
+        code = compile(source, f'plugins/{plugin_id}/{main_server}', 'exec', dont_inherit=True)
+    namespace = {'__name__': f'plugin_{plugin_id}', '__app_source_hash__': source_hash}
+    exec(code, namespace)
+    _app_plugin_namespaces[plugin_id] = namespace
+    return namespace
+`;
+
 let pyodide;
+let jsBridge;
+let bundleIndex = null;
 const hostCallPromises = new Map();
+// Code whose package imports were last resolved, by plugin id
+const resolvedImports = new Map();
+
+const callQueue = [];
+let activeCalls = 0;
+let pendingBytes = 0;
+// Moving average of call duration, used for the retry-after hint
+let averageCallMs = 1000;
+
+async function fetchBundleIndex() {
+  try {
+    const response = await fetch(`${PLUGINS_BASE_URL}bundles.json`);
+    return response.ok ? await response.json() : null;
+  } catch (error) {
+    return null;
+  }
+}
+
+/**
+ * Returns the snapshot cache, or null when Cache Storage is unavailable in this context
+ */
+async function openSnapshotCache() {
+  if (typeof caches === 'undefined') return null;
+  try {
+    return await caches.open(SNAPSHOT_CACHE_NAME);
+  } catch (error) {
+    return null;
+  }
+}
+
+async function readSnapshot(cache, key) {
+  const response = await cache.match(key);
+  return response ? new Uint8Array(await response.arrayBuffer()) : null;
+}
+
+async function writeSnapshot(cache, key, snapshot) {
+  // Snapshots of older bundle sets are useless after a plugin update
+  for (const request of await cache.keys()) {
+    if (request.url !== key) await cache.delete(request);
+  }
+  await cache.put(key, new Response(snapshot));
+}
+
+/**
+ * Writes the plugin bundle into the Pyodide FS and returns its path
+ */
+async function fetchBundle(pluginId) {
+  const entry = bundleIndex?.bundles?.[pluginId];
+  if (!entry) return null;
+  const response = await fetch(`${PLUGINS_BASE_URL}${entry.file}`);
+  if (!response.ok) return null;
+  const path = `/app-bundles/${pluginId}.zip`;
+  pyodide.FS.mkdirTree('/app-bundles');
+  pyodide.FS.writeFile(path, new Uint8Array(await response.arrayBuffer()));
+  return path;
+}
+
+/**
+ * Loads packages from the Pyodide distribution (e.g. tzdata for time-test) that the plugin imports.
+ * Resolving them parses the code, so it runs only when the plugin source changes; a plugin
+ * loaded from its bundle uses the import list recorded by build_bundles.py instead.
+ */
+async function loadPluginPackages(pluginId, pythonCode) {
+  const imports =
+    pythonCode ?? bundleIndex?.bundles?.[pluginId]?.imports?.map((name) => `import ${name}`).join('\n');
+  if (!imports || resolvedImports.get(pluginId) === imports) return;
+  await pyodide.loadPackagesFromImports(imports);
+  resolvedImports.set(pluginId, imports);
+}
+
+async function loadPlugin(pluginId, pythonCode) {
+  await loadPluginPackages(pluginId, pythonCode);
+  const loadPluginFunc = pyodide.globals.get('_app_load_plugin');
+  try {
+    const namespaces = pyodide.globals.get('_app_plugin_namespaces');
+    const isLoaded = namespaces.has(pluginId);
+    namespaces.destroy();
+    const bundlePath = isLoaded ? null : await fetchBundle(pluginId);
+    return loadPluginFunc.callKwargs(pluginId, { source: pythonCode, bundle_path: bundlePath });
+  } finally {
+    loadPluginFunc.destroy();
+  }
+}
 
 async function initializePyodide() {
   if (pyodide) return;
-  
+  const startedAt = performance.now();
+
   // Notify about loading start
   self.postMessage({ type: 'pyodide_status', status: 'loading', message: 'Загрузка Python среды...' });
-  
+
+  let restored = false;
   try {
-    pyodide = await loadPyodide({ indexURL: '../public/pyodide/' });
-    
+    bundleIndex = await fetchBundleIndex();
+    // Plugins are preloaded and a snapshot is made only when it can be stored
+    const snapshotCache = bundleIndex ? await openSnapshotCache() : null;
+    const snapshotKey = snapshotCache ? `${SNAPSHOT_KEY_BASE}${bundleIndex.hash}` : null;
+
+    if (snapshotKey) {
+      try {
+        const snapshot = await readSnapshot(snapshotCache, snapshotKey);
+        if (snapshot) {
+          pyodide = await loadPyodide({ indexURL: PYODIDE_INDEX_URL, _loadSnapshot: snapshot });
+          restored = true;
+        }
+      } catch (error) {
+        console.warn('[Worker] Не удалось восстановить снимок Pyodide, выполняется холодный старт:', error);
+        pyodide = null;
+      }
+    }
+
+    if (!pyodide) {
+      pyodide = await loadPyodide({ indexURL: PYODIDE_INDEX_URL, _makeSnapshot: Boolean(snapshotKey) });
+      pyodide.runPython(PLUGIN_LOADER);
+
+      if (snapshotKey) {
+        // The snapshot must be taken before any JS object is passed into Python
+        for (const pluginId of Object.keys(bundleIndex.bundles)) {
+          try {
+            await loadPlugin(pluginId, null);
+          } catch (error) {
+            console.warn(`[Worker] Бандл плагина ${pluginId} не загружен:`, error);
+          }
+        }
+        try {
+          await writeSnapshot(snapshotCache, snapshotKey, pyodide.makeMemorySnapshot());
+        } catch (error) {
+          console.warn('[Worker] Не удалось сохранить снимок памяти Pyodide:', error);
+        }
+      }
+    }
+
     // Notify about successful loading
-    self.postMessage({ type: 'pyodide_status', status: 'ready', message: 'Python среда готова' });
+    const startupMs = Math.round(performance.now() - startedAt);
+    self.postMessage({
+      type: 'pyodide_status',
+      status: 'ready',
+      message: `Python среда готова за ${startupMs} мс${restored ? ' (из снимка памяти)' : ''}`,
+      startupMs,
+      restored,
+    });
   } catch (error) {
     // Notify about loading error
     self.postMessage({ type: 'pyodide_status', status: 'error', message: `Ошибка загрузки Python: ${error.message}` });
     throw error;
   }
-  
-  pyodide.globals.set('js', {
+
+  jsBridge = {
     sendMessageToChat: (message) => {
       const jsMessage = message.toJs({ dict_converter: Object.fromEntries });
       self.postMessage({ type: 'host_call', func: 'sendMessageToChat', args: [jsMessage] });
@@ -36,15 +230,159 @@ async function initializePyodide() {
         self.postMessage({ type: 'host_call', func: 'host_fetch', callId, args: [url] });
       });
     }
-  });
+  };
+  pyodide.globals.set('js', jsBridge);
+}
+
+/**
+ * Approximate memory footprint of a structured-cloned value
+ */
+function estimateSize(value, depth = 0) {
+  if (value == null) return 8;
+  if (typeof value === 'string') return value.length * 2;
+  if (typeof value !== 'object') return 8;
+  if (ArrayBuffer.isView(value) || value instanceof ArrayBuffer) return value.byteLength;
+  if (depth > 8) return 0;
+  let size = 0;
+  for (const key in value) {
+    size += key.length * 2 + estimateSize(value[key], depth + 1);
+  }
+  return size;
+}
+
+function admitCall(data) {
+  const bytes = estimateSize(data.toolInput) + (data.pythonCode?.length ?? 0) * 2;
+  const isIdle = activeCalls === 0 && callQueue.length === 0;
+  // A single oversized call is still admitted when nothing else is running or waiting
+  if (callQueue.length >= MAX_PENDING_CALLS || (!isIdle && pendingBytes + bytes > MAX_PENDING_BYTES)) {
+    const retryAfterMs = Math.max(
+      MIN_RETRY_AFTER_MS,
+      Math.round(Math.ceil((callQueue.length + 1) / MAX_ACTIVE_CALLS) * averageCallMs),
+    );
+    self.postMessage({
+      type: 'error',
+      callId: data.callId,
+      code: OVERLOADED_ERROR_CODE,
+      error: `Python воркер перегружен (${callQueue.length} вызовов в очереди), повторите через ${retryAfterMs} мс`,
+      retryAfterMs,
+    });
+    return;
+  }
+
+  pendingBytes += bytes;
+  callQueue.push({ data, bytes });
+  drainQueue();
+}
+
+function drainQueue() {
+  while (activeCalls < MAX_ACTIVE_CALLS && callQueue.length > 0) {
+    const { data, bytes } = callQueue.shift();
+    const startedAt = performance.now();
+    activeCalls += 1;
+    runPythonTool(data).finally(() => {
+      activeCalls -= 1;
+      pendingBytes -= bytes;
+      averageCallMs = averageCallMs * 0.8 + (performance.now() - startedAt) * 0.2;
+      drainQueue();
+    });
+  }
+}
+
+/**
+ * Lets the plugin parse fields/max_inline_chars before the tool runs, so invalid values are
+ * rejected without running the analysis. Plugins opt in by defining
+ * shape_tool_options(tool_name, params), which returns the parsed options or a -32602 error.
+ */
+function readShapeOptions(namespace, toolName, toolInput) {
+  const optionsFunc = namespace.get('shape_tool_options');
+  if (!optionsFunc) return undefined;
+  const params = {};
+  for (const key of ['fields', 'max_inline_chars']) {
+    if (toolInput && typeof toolInput === 'object' && key in toolInput) params[key] = toolInput[key];
+  }
+  const paramsProxy = pyodide.toPy(params);
+  try {
+    return optionsFunc(toolName, paramsProxy);
+  } finally {
+    paramsProxy.destroy();
+    optionsFunc.destroy();
+  }
+}
+
+/**
+ * Lets the plugin drop unrequested fields and move large texts into its result store
+ * before the result is converted with toJs, using the options from readShapeOptions.
+ * Plugins opt in by defining shape_tool_result(tool_name, response, options).
+ */
+function shapeResult(namespace, toolName, resultProxy, optionsProxy) {
+  const shapeFunc = optionsProxy && namespace.get('shape_tool_result');
+  if (!shapeFunc) return resultProxy;
+  try {
+    return shapeFunc(toolName, resultProxy, optionsProxy);
+  } finally {
+    shapeFunc.destroy();
+    resultProxy.destroy();
+  }
+}
+
+async function runPythonTool({ callId, pluginId, pythonCode, toolName, toolInput }) {
+  let namespace;
+  let optionsProxy;
+  try {
+    await pyodideReadyPromise;
+    namespace = await loadPlugin(pluginId, pythonCode);
+    // Plugins declare `js` themselves (e.g. `js = None`), so the bridge is set after loading
+    namespace.set('js', jsBridge);
+    const toolFunc = namespace.get(toolName);
+    if (!toolFunc) throw new Error(`Python-функция "${toolName}" не найдена.`);
+
+    optionsProxy = readShapeOptions(namespace, toolName, toolInput);
+    // An invalid-params error is returned as the tool result, the tool itself is not called
+    const resultProxy = optionsProxy?.has('error')
+      ? optionsProxy.copy()
+      : shapeResult(namespace, toolName, await toolFunc(toolInput), optionsProxy);
+    const convertStartedAt = performance.now();
+    const result = resultProxy.toJs({ dict_converter: Object.fromEntries });
+    const convertMs = performance.now() - convertStartedAt;
+    resultProxy.destroy();
+
+    self.postMessage({ type: 'complete', callId, result, metrics: { convertMs, resultBytes: estimateSize(result) } });
+  } catch (e) {
+    self.postMessage({ type: 'error', callId: callId, error: e.message });
+  } finally {
+    optionsProxy?.destroy();
+    namespace?.destroy();
+  }
+}
+
+/**
+ * Loads plugins ahead of their first call, so the first run skips package loading and exec.
+ * Runs only while no tool calls are pending.
+ */
+async function prewarmPlugins(plugins) {
+  for (const { pluginId, pythonCode } of plugins) {
+    if (activeCalls + callQueue.length > 0) return;
+    try {
+      const namespace = await loadPlugin(pluginId, pythonCode);
+      namespace.destroy();
+    } catch (error) {
+      console.warn(`[Worker] Не удалось предзагрузить плагин ${pluginId}:`, error);
+    }
+  }
 }
 
 const pyodideReadyPromise = initializePyodide();
 
 self.onmessage = async (event) => {
-  await pyodideReadyPromise;
   const { type, callId } = event.data;
 
+  // Admission happens before waiting for Pyodide, so a burst during startup is bounded too
+  if (type === 'run_python_tool') {
+    admitCall(event.data);
+    return;
+  }
+
+  await pyodideReadyPromise;
   if (type === 'host_result') {
     console.log('[Worker] Получен ответ от хоста:', event.data);
     const promise = hostCallPromises.get(callId);
@@ -58,20 +396,7 @@ self.onmessage = async (event) => {
       }
       hostCallPromises.delete(callId);
     }
-  } else if (type === 'run_python_tool') {
-    const { pythonCode, toolName, toolInput } = event.data;
-    try {
-      await pyodide.runPythonAsync(pythonCode);
-      const toolFunc = pyodide.globals.get(toolName);
-      if (!toolFunc) throw new Error(`Python-функция "${toolName}" не найдена.`);
-      
-      const resultProxy = await toolFunc(toolInput);
-      const result = resultProxy.toJs({ dict_converter: Object.fromEntries });
-      resultProxy.destroy();
-
-      self.postMessage({ type: 'complete', callId, result });
-    } catch (e) {
-      self.postMessage({ type: 'error', callId: callId, error: e.message });
-    }
+  } else if (type === 'prewarm_plugins') {
+    await prewarmPlugins(event.data.plugins);
   }
-}; 
\ No newline at end of file
+};
@@ -0,0 +1,33 @@
+import { colorfulLog } from '@extension/shared';
+import { execFileSync } from 'node:child_process';
+import { resolve } from 'node:path';
+import type { PluginOption } from 'vite';
+
+const pythonHostDir = resolve(import.meta.dirname, '..', '..', '..', 'python-host');
+const python = process.env.PYTHON ?? 'python3';
+
+/**
+ * Generates public/plugins/bundles.json with the bytecode bundles and public/plugins/registry.json
+ * before public/ is copied into the build, so every build ships them. The scripts leave unchanged
+ * files untouched, so regenerating them does not retrigger watch builds.
+ *
+ * Without a Python interpreter the indexes are skipped with a warning and the previously generated
+ * files are shipped; a failing script (e.g. an invalid manifest) still fails the build.
+ */
+export default (): PluginOption => ({
+  name: 'build-plugin-index',
+  buildStart() {
+    try {
+      for (const script of ['build_bundles.py', 'build_registry.py']) {
+        execFileSync(python, [resolve(pythonHostDir, script)], { stdio: 'inherit' });
+      }
+    } catch (error) {
+      if ((error as NodeJS.ErrnoException).code !== 'ENOENT') {
+        throw error;
+      }
+      colorfulLog(`${python} not found, plugin bundles and registry index were not regenerated`, 'warning');
+      return;
+    }
+    colorfulLog('Plugin bundles and registry index are up to date', 'success');
+  },
+});
@@ -2,6 +2,7 @@ import { resolve } from 'node:path';
 import { defineConfig, type PluginOption } from 'vite';
 import libAssetsPlugin from '@laynezh/vite-plugin-lib-assets';
 import makeManifestPlugin from './utils/plugins/make-manifest-plugin.js';
+import buildPluginIndexPlugin from './utils/plugins/build-plugin-index-plugin.js';
 import { watchPublicPlugin, watchRebuildPlugin } from '@extension/hmr';
 import { watchOption } from '@extension/vite-config';
 import env, { IS_DEV, IS_PROD } from '@extension/env';
@@ -26,6 +27,7 @@ export default defineConfig({
     libAssetsPlugin({
       outputPath: outDir,
     }) as PluginOption,
+    buildPluginIndexPlugin(),
     watchPublicPlugin(),
     makeManifestPlugin({ outDir }),
     IS_DEV && watchRebuildPlugin({ reload: true, id: 'chrome-extension-hmr' }),
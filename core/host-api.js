@@ -59,10 +59,43 @@ async function findTargetTab(context) {
     return targetTab;
 }
 
+/**
+ * Упаковывает заголовки страницы в типизированные массивы для analyze_headings.
+ * Python читает их порциями через subarray и не копирует весь массив объектов.
+ * В воркфлоу доступна как шаг host.packHeadings перед python.analyze_headings.
+ * @param {Array<{tagName?: string, level?: number, textContent?: string, text?: string}>} headings
+ * @returns {{levels: Uint8Array, text_offsets: Uint32Array, text_utf8: Uint8Array}}
+ */
+export function packHeadings(headings) {
+    const encoder = new TextEncoder();
+    const levels = new Uint8Array(headings.length);
+    const textOffsets = new Uint32Array(headings.length + 1);
+    const encodedTexts = [];
+    let totalBytes = 0;
+
+    headings.forEach((heading, index) => {
+        const level = heading.level ?? Number(String(heading.tagName || '').replace(/^h/i, ''));
+        levels[index] = level >= 1 && level <= 6 ? level : 0;
+        const encoded = encoder.encode(heading.text ?? heading.textContent ?? '');
+        encodedTexts.push(encoded);
+        textOffsets[index] = totalBytes;
+        totalBytes += encoded.length;
+    });
+    textOffsets[headings.length] = totalBytes;
+
+    const textUtf8 = new Uint8Array(totalBytes);
+    encodedTexts.forEach((encoded, index) => textUtf8.set(encoded, textOffsets[index]));
+
+    return { levels, text_offsets: textOffsets, text_utf8: textUtf8 };
+}
+
 // --- Главный экспортируемый объект API ---
 export const hostApi = {
     getElements: async (options, context) => { /* ... код без изменений ... */ },
     getActivePageContent: async (selectors, context) => { /* ... код без изменений ... */ },
+
+    // Вход: { headings_list }, выход: { levels, text_offsets, text_utf8 } для analyze_headings
+    packHeadings: async (input) => packHeadings(input.headings_list ?? []),
     
     host_fetch: async (url) => {
         // Просто пересылаем задачу в background, который имеет все права
@@ -1,29 +1,81 @@
+// Used only when /plugins/registry.json has not been generated (python-host/build_registry.py)
 const PLUGIN_DIRS = ['ozon-analyzer'];
 
+const REQUIRED_MANIFEST_FIELDS = ['name', 'version', 'description', 'main_server'];
+
+// In-memory registry. It is rebuilt only when the index hash changes, and then only
+// the plugins whose manifest hash changed are fetched again.
+let registry = { complete: false, hash: null, plugins: new Map() };
+let registryUpdate = null;
+
+async function fetchRegistryIndex() {
+    try {
+        const response = await fetch('/plugins/registry.json', { cache: 'no-cache' });
+        return response.ok ? await response.json() : null;
+    } catch (error) {
+        return null;
+    }
+}
+
+function validateManifest(dirName, manifest) {
+    if (!manifest || typeof manifest !== 'object') {
+        throw new Error(`Manifest of '${dirName}' is not a JSON object`);
+    }
+    const missing = REQUIRED_MANIFEST_FIELDS.filter(field => typeof manifest[field] !== 'string');
+    if (missing.length > 0) {
+        throw new Error(`Manifest of '${dirName}' is missing required fields: ${missing.join(', ')}`);
+    }
+    return manifest;
+}
+
+async function loadPlugin(dirName) {
+    const manifestUrl = `/plugins/${dirName}/manifest.json`;
+    const response = await fetch(manifestUrl);
+
+    if (!response.ok) {
+        throw new Error(`Failed to fetch manifest: ${response.statusText}`);
+    }
+
+    const manifest = validateManifest(dirName, await response.json());
+    return {
+        id: dirName,
+        ...manifest,
+        iconUrl: `/plugins/${dirName}/${manifest.icon}`
+    };
+}
+
+async function updateRegistry() {
+    const index = await fetchRegistryIndex();
+    const hash = index?.hash ?? null;
+    if (registry.complete && hash === registry.hash) return registry;
+
+    const dirNames = index ? Object.keys(index.plugins) : PLUGIN_DIRS;
+    // Manifests are fetched in parallel; a broken plugin does not hide the others
+    const results = await Promise.allSettled(dirNames.map(async dirName => {
+        const manifestHash = index?.plugins[dirName].manifest_sha256 ?? null;
+        const cached = registry.plugins.get(dirName);
+        if (cached && cached.manifestHash === manifestHash) return cached;
+        return { manifestHash, plugin: await loadPlugin(dirName) };
+    }));
+
+    const plugins = new Map();
+    results.forEach((result, i) => {
+        if (result.status === 'fulfilled') plugins.set(dirNames[i], result.value);
+        else console.error(`Failed to load plugin from '${dirNames[i]}':`, result.reason);
+    });
+
+    // Without a generated index the registry is kept until a plugin fails to load
+    registry = { complete: plugins.size === dirNames.length, hash, plugins };
+    return registry;
+}
+
 export async function getAvailablePlugins() {
-    const plugins = [];
-    
-    for (const dirName of PLUGIN_DIRS) {
-        try {
-            const manifestUrl = `/plugins/${dirName}/manifest.json`;
-            const response = await fetch(manifestUrl);
-
-            if (!response.ok) {
-                throw new Error(`Failed to fetch manifest: ${response.statusText}`);
-            }
-
-            const manifest = await response.json();
-            
-            plugins.push({
-                id: dirName,
-                ...manifest,
-                iconUrl: `/plugins/${dirName}/${manifest.icon}`
-            });
-
-        } catch (error) {
-            console.error(`Failed to load plugin from '${dirName}':`, error);
-        }
+    // Concurrent callers share one update
+    if (!registryUpdate) {
+        registryUpdate = updateRegistry().finally(() => {
+            registryUpdate = null;
+        });
     }
-    
-    return plugins;
-}
\ No newline at end of file
+    const { plugins } = await registryUpdate;
+    return Array.from(plugins.values(), ({ plugin }) => plugin);
+}
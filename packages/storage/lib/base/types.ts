@@ -52,3 +52,10 @@ export interface ThemeStateType {
 export type ThemeStorageType = BaseStorageType<ThemeStateType> & {
   toggle: () => Promise<void>;
 };
+
+export type PluginUsageStateType = Record<string, number>;
+
+export type PluginUsageStorageType = BaseStorageType<PluginUsageStateType> & {
+  recordUse: (pluginId: string) => Promise<void>;
+  getMostUsed: (pluginIds: string[], limit: number) => Promise<string[]>;
+};
@@ -1 +1,2 @@
 export * from './example-theme-storage.js';
+export * from './plugin-usage-storage.js';
@@ -0,0 +1,39 @@
+import { createStorage, StorageEnum } from '../base/index.js';
+import type { PluginUsageStateType, PluginUsageStorageType } from '../base/index.js';
+
+const storage = createStorage<PluginUsageStateType>(
+  'plugin-usage-storage-key',
+  {},
+  {
+    storageEnum: StorageEnum.Local,
+  },
+);
+
+// storage.set reads the cached state before writing it back, so concurrent updates
+// would overwrite each other. Updates are chained to run one at a time.
+let pendingUpdate: Promise<void> = Promise.resolve();
+
+/**
+ * Number of tool runs per plugin, used to pick plugins to pre-warm in the Pyodide worker
+ */
+export const pluginUsageStorage: PluginUsageStorageType = {
+  ...storage,
+  recordUse: (pluginId: string) => {
+    const update = pendingUpdate.then(() =>
+      storage.set(currentState => ({
+        ...currentState,
+        [pluginId]: (currentState[pluginId] ?? 0) + 1,
+      })),
+    );
+    // A failed update must not block the ones queued after it
+    pendingUpdate = update.catch(() => undefined);
+    return update;
+  },
+  getMostUsed: async (pluginIds: string[], limit: number) => {
+    const usage = await storage.get();
+    return pluginIds
+      .filter(pluginId => usage[pluginId])
+      .sort((a, b) => usage[b] - usage[a])
+      .slice(0, limit);
+  },
+};
@@ -22,7 +22,7 @@ const SidePanel = () => {
 
   const loadPlugins = async () => {
     try {
-      const response = await chrome.runtime.sendMessage({ type: 'GET_PLUGINS' });
+      const response = await chrome.runtime.sendMessage({ type: 'GET_PLUGINS', prewarm: true });
       if (response) {
         setPlugins(response);
       }
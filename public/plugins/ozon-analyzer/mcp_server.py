@@ -1,4 +1,6 @@
-from typing import Any, Dict, Protocol, runtime_checkable
+import hashlib
+import re
+from typing import Any, Dict, Iterator, List, Optional, Protocol, Tuple, runtime_checkable
 
 # Никаких `requests` или `pyodide_http`. Вся работа с сетью делегирована.
 # `js` - это глобальный объект, который предоставляет Pyodide для вызова
@@ -87,16 +89,235 @@ async def fetch_current_time(input_data: Any) -> Dict[str, Any]:
         js.sendMessageToChat({"content": error_message}) # type: ignore
         return { "status": "error", "error": str(e) }
 
-# --- Старая синхронная функция для примера и обратной совместимости ---
+# --- Анализ заголовков ---
+
+# Заголовки читаются порциями, чтобы не копировать весь массив из JS сразу
+HEADINGS_CHUNK_SIZE = 4096
+
+# Пределы, которые держат память ограниченной на страницах со 100k+ заголовков
+MAX_OUTLINE_NODES = 2000
+MAX_ISSUE_EXAMPLES = 50
+MAX_HEADING_TEXT_LENGTH = 200
+
+# Столько первых уникальных текстов отслеживается точно, с индексом первого
+# вхождения (~1 МБ); остальные попадают в фильтр Блума фиксированного размера
+MAX_TRACKED_TEXTS = 10_000
+DUPLICATE_FILTER_BITS = 1 << 23  # 1 МБ
+DUPLICATE_FILTER_HASHES = 4
+
+HEADING_TAG_RE = re.compile(r'^h([1-6])$', re.IGNORECASE)
+
+
+class HeadingAnalyzer:
+    """
+    Однопроходный анализатор заголовков страницы.
+
+    Строит дерево оглавления и находит пропуски уровней, дубликаты и пустые
+    заголовки. Хранит только ограниченное число узлов и примеров проблем.
+    Дубликаты ищутся по хешам текстов: первые MAX_TRACKED_TEXTS точно, а дальше
+    фильтром Блума, который может изредка принять новый текст за повтор.
+    Тогда в результате duplicates.complete равно False.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.level_counts = [0] * 6
+        self.outline: List[Dict[str, Any]] = []
+        self.outline_nodes = 0
+        self.outline_truncated = False
+        # Стек открытых узлов оглавления: (уровень, узел)
+        self.stack: List[Tuple[int, Optional[Dict[str, Any]]]] = []
+        self.previous_level: Optional[int] = None
+        self.seen_texts: Dict[int, int] = {}
+        self.seen_filter: Optional[bytearray] = None
+        self.skipped = {"count": 0, "examples": []}
+        self.duplicates = {"count": 0, "examples": []}
+        self.empty = {"count": 0, "examples": []}
+
+    def feed(self, level: int, text: str):
+        index = self.total
+        self.total += 1
+        self.level_counts[level - 1] += 1
+        text = ' '.join(text.split())
+        short_text = text[:MAX_HEADING_TEXT_LENGTH]
+
+        if self.previous_level is not None and level > self.previous_level + 1:
+            self._add_issue(self.skipped, {
+                "index": index, "from": f"h{self.previous_level}", "to": f"h{level}", "text": short_text
+            })
+        self.previous_level = level
+
+        if not text:
+            self._add_issue(self.empty, {"index": index, "level": f"h{level}"})
+        else:
+            self._check_duplicate(index, text, short_text)
+
+        self._add_to_outline(level, short_text)
+
+    def _check_duplicate(self, index: int, text: str, short_text: str):
+        digest = hashlib.blake2b(text.casefold().encode('utf-8'), digest_size=16).digest()
+        key = int.from_bytes(digest[:8], 'little')
+        first_index = self.seen_texts.get(key)
+        if first_index is not None:
+            self._add_issue(self.duplicates, {"index": index, "first_index": first_index, "text": short_text})
+        elif len(self.seen_texts) < MAX_TRACKED_TEXTS:
+            self.seen_texts[key] = index
+        elif self._filter_add(digest):
+            # Первое вхождение уже не хранится, известен только сам повтор
+            self._add_issue(self.duplicates, {"index": index, "first_index": None, "text": short_text})
+
+    def _filter_add(self, digest: bytes) -> bool:
+        """Добавляет хеш в фильтр Блума и возвращает True, если он, вероятно, уже был"""
+        if self.seen_filter is None:
+            self.seen_filter = bytearray(DUPLICATE_FILTER_BITS // 8)
+        seen = True
+        for i in range(DUPLICATE_FILTER_HASHES):
+            bit = int.from_bytes(digest[i * 4:i * 4 + 4], 'little') % DUPLICATE_FILTER_BITS
+            byte, mask = bit >> 3, 1 << (bit & 7)
+            if not self.seen_filter[byte] & mask:
+                seen = False
+                self.seen_filter[byte] |= mask
+        return seen
+
+    def _add_to_outline(self, level: int, text: str):
+        while self.stack and self.stack[-1][0] >= level:
+            self.stack.pop()
+
+        # Если родитель не попал в оглавление из-за лимита, не попадают и его потомки
+        parent_dropped = bool(self.stack) and self.stack[-1][1] is None
+        node = None
+        if self.outline_nodes < MAX_OUTLINE_NODES and not parent_dropped:
+            node = {"level": f"h{level}", "text": text, "children": []}
+            self.outline_nodes += 1
+            if self.stack:
+                self.stack[-1][1]["children"].append(node)
+            else:
+                self.outline.append(node)
+        else:
+            self.outline_truncated = True
+        self.stack.append((level, node))
+
+    @staticmethod
+    def _add_issue(issue: Dict[str, Any], example: Dict[str, Any]):
+        issue["count"] += 1
+        if len(issue["examples"]) < MAX_ISSUE_EXAMPLES:
+            issue["examples"].append(example)
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            "total_headings": self.total,
+            "levels": {f"h{i + 1}": count for i, count in enumerate(self.level_counts)},
+            "outline": self.outline,
+            "outline_truncated": self.outline_truncated,
+            "skipped_levels": self.skipped,
+            "duplicates": dict(self.duplicates, complete=self.seen_filter is None),
+            "empty_headings": self.empty
+        }
+
+
+def _field(item: Any, *names: str) -> Any:
+    """Читает поле из JsProxy-объекта или словаря"""
+    for name in names:
+        if isinstance(item, dict):
+            if name in item:
+                return item[name]
+        else:
+            value = getattr(item, name, None)
+            if value is not None:
+                return value
+    return None
+
+
+def _heading_level(item: Any) -> Optional[int]:
+    level = _field(item, 'level')
+    if level is None:
+        match = HEADING_TAG_RE.match(str(_field(item, 'tagName', 'tag') or ''))
+        return int(match.group(1)) if match else None
+    if isinstance(level, str):
+        match = HEADING_TAG_RE.match(level)
+        level = match.group(1) if match else level
+    try:
+        level = int(level)
+    except (TypeError, ValueError, OverflowError):
+        # Битый элемент пропускается так же, как уровень вне 1..6
+        return None
+    return level if 1 <= level <= 6 else None
+
+
+def _slice(buffer: Any, start: int, end: int) -> bytes:
+    """Копирует из буфера только нужный диапазон.
+
+    Для JS TypedArray используется subarray, которое не копирует данные
+    на стороне JS; в Python переносится только эта порция.
+    """
+    if hasattr(buffer, 'subarray'):
+        return buffer.subarray(start, end).to_py()
+    return buffer[start:end]
+
+
+def iter_packed_headings(levels: Any, text_offsets: Any, text_utf8: Any) -> Iterator[Tuple[int, str]]:
+    """
+    Читает заголовки из упакованного представления:
+    - levels: Uint8Array с уровнями 1..6;
+    - text_offsets: Uint32Array длиной N + 1 с байтовыми смещениями текстов;
+    - text_utf8: Uint8Array с текстами всех заголовков подряд в UTF-8.
+    """
+    total = len(levels)
+    for start in range(0, total, HEADINGS_CHUNK_SIZE):
+        end = min(start + HEADINGS_CHUNK_SIZE, total)
+        chunk_levels = bytes(_slice(levels, start, end))
+        chunk_offsets = list(_slice(text_offsets, start, end + 1))
+        base = chunk_offsets[0]
+        chunk_text = bytes(_slice(text_utf8, base, chunk_offsets[-1]))
+        for i, level in enumerate(chunk_levels):
+            if not 1 <= level <= 6:
+                continue
+            raw = chunk_text[chunk_offsets[i] - base:chunk_offsets[i + 1] - base]
+            yield level, raw.decode('utf-8', errors='replace')
+
+
+def iter_heading_items(headings: Any) -> Iterator[Tuple[int, str]]:
+    """Лениво обходит массив заголовков (JsProxy или список) без to_py()"""
+    for item in headings:
+        level = _heading_level(item)
+        if level is not None:
+            yield level, str(_field(item, 'text', 'textContent') or '')
+
 
 def analyze_headings(input_data: Any) -> Dict[str, Any]:
     """
-    Стабильная синхронная функция для анализа заголовков.
-    Не имеет внешних зависимостей и не делает асинхронных вызовов.
+    Анализирует заголовки страницы за один проход.
+
+    Принимает либо упакованные буферы `levels`, `text_offsets`, `text_utf8`
+    (см. iter_packed_headings), либо массив `headings_list` с объектами
+    вида {level | tagName, text | textContent}. Массив не конвертируется
+    целиком через to_py(), а читается по элементам.
+
+    Упакованный вход в воркфлоу готовит предыдущий шаг host.packHeadings:
+    {"levels": "{{steps.<шаг>.output.levels}}", "text_offsets": ..., "text_utf8": ...}.
     """
-    headings_list = input_data.headings_list.to_py()
-    number_of_headings = len(headings_list)
-    js.sendMessageToChat({"content": f"Python: (analyze_headings) получил {number_of_headings} заголовков."}) # type: ignore
-    summary = f"Python: Анализ заголовков завершен."
+    levels = _field(input_data, 'levels')
+    if levels is not None:
+        text_offsets = _field(input_data, 'text_offsets')
+        text_utf8 = _field(input_data, 'text_utf8')
+        if text_offsets is None or text_utf8 is None or len(text_offsets) != len(levels) + 1:
+            return {
+                "status": "error",
+                "error": "Упакованные заголовки требуют levels, text_offsets (длиной levels + 1) и text_utf8"
+            }
+        headings = iter_packed_headings(levels, text_offsets, text_utf8)
+    else:
+        headings = iter_heading_items(_field(input_data, 'headings_list') or [])
+
+    analyzer = HeadingAnalyzer()
+    for level, text in headings:
+        analyzer.feed(level, text)
+
+    result = analyzer.result()
+    js.sendMessageToChat({"content": f"Python: (analyze_headings) получил {analyzer.total} заголовков."}) # type: ignore
+    summary = (
+        f"Python: Анализ заголовков завершен. Пропусков уровней: {analyzer.skipped['count']}, "
+        f"дубликатов: {analyzer.duplicates['count']}, пустых: {analyzer.empty['count']}."
+    )
     js.sendMessageToChat({"content": summary}) # type: ignore
-    return {"status": "success", "total_headings": number_of_headings}
\ No newline at end of file
+    return dict(result, status="success")
@@ -0,0 +1,233 @@
+"""
+CPython-хост для пакетного анализа страниц плагинами.
+
+Загружает mcp_server.py любого плагина без изменений, подставляет заглушку
+моста `js` и распределяет страницы по пулу процессов размером с число ядер.
+Результаты пишутся потоком в JSONL по мере готовности.
+
+Примеры:
+    python python-host/batch_host.py ozon-analyzer crawl/pages/ -o results.jsonl
+    python python-host/batch_host.py ozon-analyzer crawl/pages.jsonl --workers 8
+    python python-host/batch_host.py time-test zones.jsonl --method get_time --offline
+"""
+
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import inspect
+import json
+import multiprocessing
+import os
+import sys
+import time
+from types import ModuleType
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from js_bridge import JsBridgeStub, wrap
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLUGINS_DIR = os.path.join(REPO_ROOT, 'chrome-extension', 'public', 'plugins')
+
+PAGE_SUFFIXES = ('.html', '.htm')
+
+Task = Tuple[str, Any]
+
+
+class InvalidRecord:
+    """Строка JSONL, которую не удалось разобрать; попадает в результаты как ошибка"""
+
+    def __init__(self, message: str):
+        self.message = message
+
+
+def resolve_plugin_path(plugin: str) -> str:
+    """Находит mcp_server.py по ID плагина, каталогу плагина или пути к файлу"""
+    if os.path.isfile(plugin):
+        return os.path.abspath(plugin)
+    plugin_dir = plugin if os.path.isdir(plugin) else os.path.join(PLUGINS_DIR, plugin)
+    main_server = 'mcp_server.py'
+    manifest_path = os.path.join(plugin_dir, 'manifest.json')
+    if os.path.isfile(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            main_server = json.load(f).get('main_server', main_server)
+    server_path = os.path.join(plugin_dir, main_server)
+    if not os.path.isfile(server_path):
+        raise FileNotFoundError(f"Сервер плагина не найден: {server_path}")
+    return os.path.abspath(server_path)
+
+
+def load_plugin(server_path: str, bridge: JsBridgeStub) -> ModuleType:
+    """Импортирует сервер плагина как модуль и подключает к нему мост `js`"""
+    # Плагины могут как импортировать `js`, так и ожидать его глобальным
+    sys.modules['js'] = bridge  # type: ignore[assignment]
+    name = 'plugin_' + os.path.basename(os.path.dirname(server_path)).replace('-', '_')
+    spec = importlib.util.spec_from_file_location(name, server_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.js = bridge
+    return module
+
+
+class PluginRunner:
+    """Вызывает плагин так же, как это делает расширение.
+    
+    Поддерживаются три вида серверов: функция process_request (ozon-analyzer,
+    time-test), класс с методом handle_request (test-plugin, google-helper) и
+    отдельные функции-инструменты воркфлоу (public/plugins/ozon-analyzer).
+    """
+
+    def __init__(self, module: ModuleType, tool: Optional[str] = None):
+        self.module = module
+        self.tool = None
+        self.handler = None
+        if tool:
+            self.tool = getattr(module, tool, None)
+            if not callable(self.tool):
+                raise AttributeError(f"Инструмент {tool} не найден в плагине")
+        elif callable(getattr(module, 'process_request', None)):
+            self.handler = module.process_request
+        else:
+            for value in vars(module).values():
+                if (inspect.isclass(value) and value.__module__ == module.__name__
+                        and callable(getattr(value, 'handle_request', None))):
+                    self.handler = value().handle_request
+                    break
+        if self.tool is None and self.handler is None:
+            raise AttributeError("В плагине нет process_request или класса с handle_request")
+
+    async def call(self, method: str, params: Dict[str, Any]) -> Any:
+        if self.tool is not None:
+            result = self.tool(wrap(params))
+        else:
+            result = self.handler({"method": method, "params": params})
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+
+# Состояние процесса-воркера, создается один раз в init_worker
+_runner: Optional[PluginRunner] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_method = ''
+
+
+def init_worker(server_path: str, method: str, tool: Optional[str], offline: bool):
+    global _runner, _loop, _method
+    bridge = JsBridgeStub(offline=offline, quiet=True)
+    with contextlib.redirect_stdout(sys.stderr):
+        _runner = PluginRunner(load_plugin(server_path, bridge), tool)
+    _loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_loop)
+    _method = method
+
+
+def run_task(task: Task) -> Dict[str, Any]:
+    source, params = task
+    if isinstance(params, InvalidRecord):
+        return {
+            "source": source,
+            "response": {"error": {"code": -32700, "message": f"Parse error: {params.message}"}},
+            "elapsed_ms": 0
+        }
+    started = time.perf_counter()
+    try:
+        # Отладочные print() плагинов не должны смешиваться с результатами
+        with contextlib.redirect_stdout(sys.stderr):
+            response = _loop.run_until_complete(_runner.call(_method, params))
+    except Exception as e:
+        response = {"error": {"code": -32603, "message": f"{type(e).__name__}: {str(e)}"}}
+    return {
+        "source": source,
+        "response": response,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)
+    }
+
+
+def iter_tasks(input_path: str, param: str) -> Iterator[Task]:
+    """Читает страницы из каталога (*.html) или из JSONL.
+    
+    Строка JSONL - это объект параметров метода, либо объект с полями
+    "id" и "params". Битая строка не прерывает пакет, а попадает
+    в результаты ошибкой разбора.
+    """
+    if os.path.isdir(input_path):
+        for root, _dirs, files in os.walk(input_path):
+            for name in sorted(files):
+                if name.lower().endswith(PAGE_SUFFIXES):
+                    path = os.path.join(root, name)
+                    with open(path, encoding='utf-8', errors='replace') as f:
+                        yield os.path.relpath(path, input_path), {param: f.read()}
+        return
+
+    with open(input_path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield str(line_number), InvalidRecord(str(e))
+                continue
+            if isinstance(record, dict) and isinstance(record.get('params'), dict):
+                yield str(record.get('id', line_number)), record['params']
+            elif isinstance(record, dict):
+                # "id" только подписывает результат и в параметры метода не передается
+                params = {key: value for key, value in record.items() if key != 'id'}
+                yield str(record.get('id', line_number)), params
+            else:
+                yield str(line_number), {param: record}
+
+
+def run_batch(server_path: str, input_path: str, output, method: str = 'analyze_product',
+              param: str = 'page_html', tool: Optional[str] = None, workers: Optional[int] = None,
+              chunksize: int = 4, offline: bool = False) -> Dict[str, Any]:
+    """Обрабатывает все страницы пулом процессов и пишет результаты в output"""
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    stats = {"pages": 0, "errors": 0, "workers": workers}
+
+    with multiprocessing.Pool(
+        processes=workers,
+        initializer=init_worker,
+        initargs=(server_path, method, tool, offline)
+    ) as pool:
+        for result in pool.imap_unordered(run_task, iter_tasks(input_path, param), chunksize):
+            stats["pages"] += 1
+            response = result["response"]
+            if isinstance(response, dict) and response.get("error"):
+                stats["errors"] += 1
+            output.write(json.dumps(result, ensure_ascii=False, default=str) + '\n')
+            output.flush()
+
+    stats["elapsed_s"] = round(time.perf_counter() - started, 3)
+    stats["pages_per_s"] = round(stats["pages"] / stats["elapsed_s"], 1) if stats["elapsed_s"] else 0
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетный анализ страниц плагином в CPython")
+    parser.add_argument('plugin', help="ID плагина, каталог плагина или путь к mcp_server.py")
+    parser.add_argument('input', help="Каталог со страницами *.html или файл JSONL")
+    parser.add_argument('-o', '--output', help="Файл JSONL для результатов (по умолчанию stdout)")
+    parser.add_argument('--method', default='analyze_product', help="MCP метод плагина")
+    parser.add_argument('--param', default='page_html', help="Параметр, в который передается страница")
+    parser.add_argument('--tool', help="Вызывать функцию-инструмент воркфлоу вместо MCP метода")
+    parser.add_argument('--workers', type=int, help="Число процессов (по умолчанию - число ядер)")
+    parser.add_argument('--chunksize', type=int, default=4, help="Страниц на одну передачу воркеру")
+    parser.add_argument('--offline', action='store_true', help="Запретить сетевые запросы host_fetch")
+    args = parser.parse_args()
+
+    server_path = resolve_plugin_path(args.plugin)
+    with contextlib.ExitStack() as stack:
+        output = stack.enter_context(open(args.output, 'w', encoding='utf-8')) if args.output else sys.stdout
+        stats = run_batch(
+            server_path, args.input, output,
+            method=args.method, param=args.param, tool=args.tool,
+            workers=args.workers, chunksize=args.chunksize, offline=args.offline
+        )
+    sys.stderr.write(json.dumps(stats) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Сборка байткод-бандлов плагинов.
+
+Для каждого плагина из chrome-extension/public/plugins создается
+plugin.bundle.zip с manifest.json, исходным mcp_server.py и его
+скомпилированным байткодом. Рядом пишется индекс plugins/bundles.json,
+по которому pyodide-worker.js загружает бандлы и делает снимок памяти.
+
+Байткод совместим только с той версией Python, которой он скомпилирован.
+Запускайте сборку интерпретатором той же версии, что и Pyodide (см.
+pyodide-lock.json). Если версии расходятся, воркер увидит другое MAGIC
+и скомпилирует исходник из бандла сам.
+
+Запуск: python python-host/build_bundles.py
+"""
+
+import argparse
+import ast
+import hashlib
+import importlib.util
+import io
+import json
+import marshal
+import os
+import sys
+import zipfile
+from typing import Any, Dict, List, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PUBLIC_DIR = os.path.join(REPO_ROOT, 'chrome-extension', 'public')
+PLUGINS_DIR = os.path.join(PUBLIC_DIR, 'plugins')
+PYODIDE_LOCK = os.path.join(PUBLIC_DIR, 'pyodide', 'pyodide-lock.json')
+
+BUNDLE_NAME = 'plugin.bundle.zip'
+INDEX_NAME = 'bundles.json'
+
+# Фиксированная дата внутри zip, чтобы одинаковый исходник давал одинаковый бандл
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+def write_if_changed(path: str, data: bytes) -> bool:
+    """Пишет файл, только если содержимое изменилось.
+
+    Сборка в режиме watch следит за public/, и перезапись тех же байтов
+    запускала бы ее снова.
+    """
+    if os.path.isfile(path):
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    with open(path, 'wb') as f:
+        f.write(data)
+    return True
+
+
+def read_pyodide_info() -> dict:
+    with open(PYODIDE_LOCK, encoding='utf-8') as f:
+        return json.load(f)['info']
+
+
+def top_level_imports(source: str) -> List[str]:
+    """Имена модулей верхнего уровня, которые импортирует исходник.
+
+    По ним воркер загружает пакеты Pyodide, не разбирая исходник сам.
+    """
+    names = set()
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.add(node.module.split('.')[0])
+    return sorted(names)
+
+
+def build_bundle(plugin_dir: str, plugin_id: str) -> Tuple[bytes, Dict[str, Any]]:
+    """Собирает zip-бандл плагина и возвращает его содержимое и метаданные"""
+    with open(os.path.join(plugin_dir, 'manifest.json'), encoding='utf-8') as f:
+        manifest_text = f.read()
+    main_server = json.loads(manifest_text).get('main_server', 'mcp_server.py')
+    with open(os.path.join(plugin_dir, main_server), encoding='utf-8') as f:
+        source = f.read()
+
+    # Имя файла совпадает с тем, под которым воркер компилирует исходник,
+    # чтобы трейсбеки выглядели одинаково
+    code = compile(source, f'plugins/{plugin_id}/{main_server}', 'exec', dont_inherit=True)
+    meta = {
+        "plugin_id": plugin_id,
+        "main_server": main_server,
+        "source_sha256": hashlib.sha256(source.encode('utf-8')).hexdigest(),
+        "magic": importlib.util.MAGIC_NUMBER.hex(),
+        "python": '.'.join(map(str, sys.version_info[:3])),
+        "imports": top_level_imports(source)
+    }
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in (
+            ('bundle.json', json.dumps(meta, indent=2).encode('utf-8')),
+            ('manifest.json', manifest_text.encode('utf-8')),
+            (main_server, source.encode('utf-8')),
+            ('mcp_server.pyc', importlib.util.MAGIC_NUMBER + marshal.dumps(code)),
+        ):
+            archive.writestr(zipfile.ZipInfo(name, ZIP_DATE_TIME), data, zipfile.ZIP_DEFLATED)
+    return buffer.getvalue(), meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сборка байткод-бандлов плагинов")
+    parser.add_argument('--plugins-dir', default=PLUGINS_DIR, help="Каталог с плагинами")
+    args = parser.parse_args()
+
+    pyodide = read_pyodide_info()
+    if pyodide['python'].rsplit('.', 1)[0] != '{}.{}'.format(*sys.version_info[:2]):
+        sys.stderr.write(
+            f"Внимание: Pyodide {pyodide['version']} использует Python {pyodide['python']}, "
+            f"а сборка идет на {sys.version.split()[0]}. Воркер будет компилировать исходники сам.\n"
+        )
+
+    bundles = {}
+    for plugin_id in sorted(os.listdir(args.plugins_dir)):
+        plugin_dir = os.path.join(args.plugins_dir, plugin_id)
+        if not os.path.isfile(os.path.join(plugin_dir, 'manifest.json')):
+            continue
+        data, meta = build_bundle(plugin_dir, plugin_id)
+        write_if_changed(os.path.join(plugin_dir, BUNDLE_NAME), data)
+        bundles[plugin_id] = {
+            "file": f"{plugin_id}/{BUNDLE_NAME}",
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "size": len(data),
+            "imports": meta['imports']
+        }
+        print(f"{plugin_id}: {len(data)} байт")
+
+    # Хеш индекса служит ключом снимка памяти Pyodide
+    index_hash = hashlib.sha256(
+        json.dumps([pyodide['version'], bundles], sort_keys=True).encode('utf-8')
+    ).hexdigest()
+    index = {"pyodide": pyodide['version'], "hash": index_hash, "bundles": bundles}
+    write_if_changed(os.path.join(args.plugins_dir, INDEX_NAME), (json.dumps(index, indent=2) + '\n').encode('utf-8'))
+
+
+if __name__ == '__main__':
+    main()
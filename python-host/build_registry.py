@@ -0,0 +1,92 @@
+"""
+Сборка индекса реестра плагинов.
+
+Для каталога плагинов пишется plugins/registry.json с хешами manifest.json
+и главного файла сервера каждого плагина. plugin-manager.ts загружает
+этот индекс одним запросом и перечитывает манифесты только тех плагинов,
+чей хеш изменился; mcp-bridge.ts по хешу сервера сбрасывает кеш исходника.
+
+Манифесты проверяются при сборке: плагин без обязательных полей
+останавливает сборку, а не пропадает из списка молча.
+
+Запуск: python python-host/build_registry.py [--plugins-dir public/plugins]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from typing import Any, Dict
+
+from build_bundles import write_if_changed
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLUGINS_DIR = os.path.join(REPO_ROOT, 'chrome-extension', 'public', 'plugins')
+
+INDEX_NAME = 'registry.json'
+
+# Поля, без которых плагин нельзя показать в списке и запустить
+REQUIRED_MANIFEST_FIELDS = ('name', 'version', 'description', 'main_server')
+
+
+def sha256_file(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def validate_manifest(plugin_id: str, manifest: Any) -> None:
+    """Проверяет обязательные поля манифеста, ValueError при ошибке"""
+    if not isinstance(manifest, dict):
+        raise ValueError(f"{plugin_id}: manifest.json должен быть JSON-объектом")
+    missing = [field for field in REQUIRED_MANIFEST_FIELDS if not isinstance(manifest.get(field), str)]
+    if missing:
+        raise ValueError(f"{plugin_id}: в manifest.json нет полей {', '.join(missing)}")
+
+
+def build_entry(plugin_dir: str, plugin_id: str) -> Dict[str, str]:
+    """Описание плагина в индексе: хеши манифеста и главного файла сервера"""
+    manifest_path = os.path.join(plugin_dir, 'manifest.json')
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    validate_manifest(plugin_id, manifest)
+
+    server_path = os.path.join(plugin_dir, manifest['main_server'])
+    if not os.path.isfile(server_path):
+        raise ValueError(f"{plugin_id}: нет файла сервера {manifest['main_server']}")
+    return {
+        "manifest_sha256": sha256_file(manifest_path),
+        "main_server": manifest['main_server'],
+        "server_sha256": sha256_file(server_path)
+    }
+
+
+def build_registry(plugins_dir: str) -> Dict[str, Any]:
+    plugins = {}
+    for plugin_id in sorted(os.listdir(plugins_dir)):
+        plugin_dir = os.path.join(plugins_dir, plugin_id)
+        if os.path.isfile(os.path.join(plugin_dir, 'manifest.json')):
+            plugins[plugin_id] = build_entry(plugin_dir, plugin_id)
+
+    # Общий хеш меняется при любом изменении плагинов, по нему сбрасывается кеш реестра
+    index_hash = hashlib.sha256(json.dumps(plugins, sort_keys=True).encode('utf-8')).hexdigest()
+    return {"hash": index_hash, "plugins": plugins}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сборка индекса реестра плагинов")
+    parser.add_argument('--plugins-dir', default=PLUGINS_DIR, help="Каталог с плагинами")
+    args = parser.parse_args()
+
+    try:
+        registry = build_registry(args.plugins_dir)
+    except ValueError as e:
+        sys.stderr.write(f"Ошибка: {e}\n")
+        sys.exit(1)
+
+    write_if_changed(os.path.join(args.plugins_dir, INDEX_NAME), (json.dumps(registry, indent=2) + '\n').encode('utf-8'))
+    print(f"{INDEX_NAME}: {len(registry['plugins'])} плагинов, hash {registry['hash'][:12]}")
+
+
+if __name__ == '__main__':
+    main()
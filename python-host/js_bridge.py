@@ -0,0 +1,78 @@
+"""
+Заглушка JavaScript-моста `js` для запуска плагинов в обычном CPython.
+
+В браузере объект `js` создает pyodide-worker.js. Здесь он повторяет тот же
+контракт: sendMessageToChat пишет сообщения в stderr, а host_fetch выполняет
+HTTP-запрос сам и возвращает ответ в формате background-скрипта ({"data": ...}).
+"""
+
+import asyncio
+import sys
+import urllib.request
+from typing import Any, Dict
+
+
+class JsProxyStub:
+    """Замена JsProxy: доступ к полям словаря через атрибуты и метод to_py()"""
+
+    def __init__(self, value: Dict[str, Any]):
+        self._value = value
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            value = self._value[name]
+        except KeyError:
+            raise AttributeError(name) from None
+        return wrap(value)
+
+    def __getitem__(self, key: str) -> Any:
+        return wrap(self._value[key])
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return wrap(self._value.get(key, default))
+
+    def to_py(self) -> Dict[str, Any]:
+        return self._value
+
+
+class JsArrayStub(list):
+    """Замена JsProxy для массивов"""
+
+    def to_py(self) -> list:
+        return list(self)
+
+
+def wrap(value: Any) -> Any:
+    """Оборачивает значения так же, как Pyodide отдает JS-объекты в Python"""
+    if isinstance(value, dict):
+        return JsProxyStub(value)
+    if isinstance(value, list):
+        return JsArrayStub(value)
+    return value
+
+
+class JsBridgeStub:
+    """Реализация `js` для CPython-хоста"""
+
+    def __init__(self, offline: bool = False, timeout: float = 30.0, quiet: bool = False):
+        self.offline = offline
+        self.timeout = timeout
+        self.quiet = quiet
+
+    def sendMessageToChat(self, message: Dict[str, Any]) -> None:
+        if not self.quiet:
+            sys.stderr.write(f"[PYTHON] {message.get('content', message)}\n")
+
+    async def host_fetch(self, url: str) -> Dict[str, Any]:
+        if self.offline:
+            return {"error": True, "error_message": f"host_fetch отключен (offline): {url}"}
+        try:
+            data = await asyncio.to_thread(self._fetch, url)
+        except Exception as e:
+            return {"error": True, "error_message": str(e)}
+        return {"data": data}
+
+    def _fetch(self, url: str) -> str:
+        with urllib.request.urlopen(url, timeout=self.timeout) as response:
+            charset = response.headers.get_content_charset() or 'utf-8'
+            return response.read().decode(charset, errors='replace')
@@ -0,0 +1,82 @@
+"""
+Синхронизация общего цикла MCP-серверов.
+
+Блок McpServerLoop из python-host/server_loop.py (между маркерами
+mcp-server-loop) копируется в mcp_server.py каждого плагина, где такие
+маркеры уже есть. Плагины остаются однофайловыми: воркер загружает
+только главный файл сервера.
+
+Запуск: python python-host/sync_server_loop.py [--check] [--plugins-dir public/plugins]
+С --check файлы не меняются, а расхождение завершает процесс с кодом 1.
+"""
+
+import argparse
+import os
+import sys
+from typing import List, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLUGINS_DIR = os.path.join(REPO_ROOT, 'chrome-extension', 'public', 'plugins')
+CANONICAL_PATH = os.path.join(REPO_ROOT, 'python-host', 'server_loop.py')
+
+BEGIN_MARKER = '# --- mcp-server-loop: begin'
+END_MARKER = '# --- mcp-server-loop: end ---'
+
+
+def find_block(source: str, path: str) -> Tuple[int, int]:
+    """Границы блока вместе с маркерами, ValueError если маркеров нет"""
+    begin = source.find(BEGIN_MARKER)
+    end = source.find(END_MARKER, begin)
+    if begin < 0 or end < 0:
+        raise ValueError(f"{path}: нет маркеров mcp-server-loop")
+    return begin, end + len(END_MARKER)
+
+
+def read_canonical_block() -> str:
+    with open(CANONICAL_PATH, encoding='utf-8') as f:
+        source = f.read()
+    begin, end = find_block(source, CANONICAL_PATH)
+    return source[begin:end]
+
+
+def plugin_servers(plugins_dir: str) -> List[str]:
+    """Файлы серверов плагинов, содержащие блок цикла"""
+    paths = []
+    for plugin_id in sorted(os.listdir(plugins_dir)):
+        path = os.path.join(plugins_dir, plugin_id, 'mcp_server.py')
+        if os.path.isfile(path):
+            with open(path, encoding='utf-8') as f:
+                if BEGIN_MARKER in f.read():
+                    paths.append(path)
+    return paths
+
+
+def sync_file(path: str, block: str, check: bool) -> bool:
+    """Обновляет блок в файле, возвращает True если копия отличалась"""
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    begin, end = find_block(source, path)
+    if source[begin:end] == block:
+        return False
+    if not check:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(source[:begin] + block + source[end:])
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Синхронизация общего цикла MCP-серверов")
+    parser.add_argument('--check', action='store_true', help="Только проверить, что копии совпадают")
+    parser.add_argument('--plugins-dir', default=PLUGINS_DIR, help="Каталог с плагинами")
+    args = parser.parse_args()
+
+    block = read_canonical_block()
+    stale = [path for path in plugin_servers(args.plugins_dir) if sync_file(path, block, args.check)]
+    for path in stale:
+        print(f"{'Расходится' if args.check else 'Обновлен'}: {os.path.relpath(path, REPO_ROOT)}")
+    if args.check and stale:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
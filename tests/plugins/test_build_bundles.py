@@ -0,0 +1,46 @@
+"""
+Тесты сборки байткод-бандлов (python-host/build_bundles.py).
+
+Запуск: python -m pytest tests/plugins
+"""
+
+import importlib.util
+import io
+import json
+import marshal
+import os
+import sys
+import zipfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PLUGINS_DIR = os.path.join(REPO_ROOT, 'chrome-extension', 'public', 'plugins')
+
+sys.path.insert(0, os.path.join(REPO_ROOT, 'python-host'))
+
+import build_bundles  # noqa: E402
+
+
+def test_build_bundle_packs_source_bytecode_and_imports():
+    plugin_dir = os.path.join(PLUGINS_DIR, 'time-test')
+    data, meta = build_bundles.build_bundle(plugin_dir, 'time-test')
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert json.loads(archive.read('bundle.json')) == meta
+        source = archive.read(meta['main_server']).decode('utf-8')
+        pyc = archive.read('mcp_server.pyc')
+
+    with open(os.path.join(plugin_dir, 'mcp_server.py'), encoding='utf-8') as f:
+        assert source == f.read()
+    assert pyc[:4] == importlib.util.MAGIC_NUMBER
+    namespace = {}
+    exec(marshal.loads(pyc[4:]), namespace)
+    assert callable(namespace['process_request'])
+    # По списку импортов воркер загружает пакеты Pyodide
+    assert 'tzdata' in meta['imports'] and 'zoneinfo' in meta['imports']
+
+
+def test_build_bundle_is_reproducible():
+    plugin_dir = os.path.join(PLUGINS_DIR, 'test-plugin')
+    first, _meta = build_bundles.build_bundle(plugin_dir, 'test-plugin')
+    second, _meta = build_bundles.build_bundle(plugin_dir, 'test-plugin')
+    assert first == second
@@ -0,0 +1,143 @@
+"""
+Тесты анализа заголовков analyze_headings (public/plugins/ozon-analyzer).
+
+Запуск: python -m pytest tests/plugins
+"""
+
+import array
+import importlib.util
+import os
+import random
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SERVER_PATH = os.path.join(REPO_ROOT, 'public', 'plugins', 'ozon-analyzer', 'mcp_server.py')
+
+
+class ChatStub:
+    def __init__(self):
+        self.messages = []
+
+    def sendMessageToChat(self, message):
+        self.messages.append(message)
+
+
+@pytest.fixture
+def server():
+    spec = importlib.util.spec_from_file_location('ozon_analyzer_workflow', SERVER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.js = ChatStub()
+    return module
+
+
+def headings(*items):
+    return [{"tagName": f"H{level}", "textContent": text} for level, text in items]
+
+
+def pack(items):
+    levels = bytearray()
+    offsets = array.array('I', [0])
+    text = bytearray()
+    for item in items:
+        levels.append(int(item["tagName"][1]))
+        text += item["textContent"].encode('utf-8')
+        offsets.append(len(text))
+    return {"levels": bytes(levels), "text_offsets": offsets, "text_utf8": bytes(text)}
+
+
+def analyze(server, *items):
+    return server.analyze_headings({"headings_list": headings(*items)})
+
+
+def test_outline_nests_by_level(server):
+    result = analyze(server, (1, "Товар"), (2, "Описание"), (3, "Состав"), (2, "Отзывы"), (1, "Похожие"))
+
+    assert result["status"] == "success"
+    assert result["total_headings"] == 5
+    assert [node["text"] for node in result["outline"]] == ["Товар", "Похожие"]
+    product = result["outline"][0]
+    assert [node["text"] for node in product["children"]] == ["Описание", "Отзывы"]
+    assert product["children"][0]["children"][0] == {"level": "h3", "text": "Состав", "children": []}
+    assert not result["outline_truncated"]
+
+
+def test_outline_is_cut_off_at_node_limit(server, monkeypatch):
+    monkeypatch.setattr(server, 'MAX_OUTLINE_NODES', 3)
+    result = analyze(server, (1, "A"), (2, "A1"), (1, "B"), (1, "C"), (2, "C1"))
+
+    assert result["outline_truncated"]
+    assert [node["text"] for node in result["outline"]] == ["A", "B"]
+    # Потомок не попавшего в оглавление узла тоже отбрасывается
+    assert result["outline"][1]["children"] == []
+    assert result["total_headings"] == 5
+
+
+def test_skipped_levels_and_empty_headings(server):
+    result = analyze(server, (1, "Товар"), (3, "Состав"), (4, "  "), (2, ""), (5, "Примечание"))
+
+    skipped = result["skipped_levels"]
+    assert skipped["count"] == 2
+    assert skipped["examples"][0] == {"index": 1, "from": "h1", "to": "h3", "text": "Состав"}
+    assert result["empty_headings"] == {
+        "count": 2,
+        "examples": [{"index": 2, "level": "h4"}, {"index": 3, "level": "h2"}]
+    }
+
+
+def test_duplicates_are_tracked_exactly_below_limit(server):
+    result = analyze(server, (1, "Отзывы"), (2, "Состав"), (2, "  отзывы "), (3, "Состав"))
+
+    duplicates = result["duplicates"]
+    assert duplicates["complete"]
+    assert duplicates["count"] == 2
+    assert [(item["index"], item["first_index"]) for item in duplicates["examples"]] == [(2, 0), (3, 1)]
+
+
+def test_duplicates_above_limit_use_filter(server, monkeypatch):
+    monkeypatch.setattr(server, 'MAX_TRACKED_TEXTS', 2)
+    result = analyze(server, (1, "A"), (1, "B"), (1, "C"), (1, "D"), (1, "C"), (1, "A"))
+
+    duplicates = result["duplicates"]
+    assert not duplicates["complete"]
+    assert duplicates["count"] == 2
+    # Для точно отслеживаемого текста известно первое вхождение, для остальных нет
+    assert [(item["index"], item["first_index"]) for item in duplicates["examples"]] == [(4, None), (5, 0)]
+
+
+def test_packed_and_list_inputs_give_same_result(server, monkeypatch):
+    monkeypatch.setattr(server, 'HEADINGS_CHUNK_SIZE', 7)
+    rng = random.Random(7)
+    items = []
+    level = 1
+    for i in range(100):
+        level = max(1, min(6, level + rng.choice((-1, 0, 1, 2))))
+        text = '' if i % 11 == 0 else f"Раздел {i % 30} «товара»"
+        items.append({"tagName": f"H{level}", "textContent": text})
+
+    from_list = server.analyze_headings({"headings_list": items})
+    from_packed = server.analyze_headings(pack(items))
+    assert from_packed == from_list
+    assert from_list["duplicates"]["count"] > 0
+
+
+def test_malformed_items_are_skipped(server):
+    result = server.analyze_headings({"headings_list": [
+        {"level": "x", "text": "битый"},
+        {"level": 9, "text": "вне диапазона"},
+        {"level": "h2", "text": "Состав"},
+        {"tagName": "DIV", "textContent": "не заголовок"},
+    ]})
+
+    assert result["status"] == "success"
+    assert result["total_headings"] == 1
+
+
+def test_incomplete_packed_input_is_rejected(server):
+    packed = pack(headings((1, "Товар")))
+
+    result = server.analyze_headings({"levels": packed["levels"]})
+    assert result["status"] == "error"
+    result = server.analyze_headings(dict(packed, text_offsets=array.array('I', [0])))
+    assert result["status"] == "error"
@@ -0,0 +1,127 @@
+"""
+Тесты MCP-сервера ozon-analyzer в обычном CPython.
+
+Запуск: python -m pytest tests/plugins
+"""
+
+import asyncio
+import importlib.util
+import json
+import os
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SERVER_PATH = os.path.join(REPO_ROOT, 'chrome-extension', 'public', 'plugins', 'ozon-analyzer', 'mcp_server.py')
+
+PAGE_HTML = 'https://www.ozon.ru/product/vitamin-d3/'
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """Свежий экземпляр сервера с подсчетом вызовов моделей"""
+    spec = importlib.util.spec_from_file_location('ozon_analyzer_server', SERVER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    module.model_calls = []
+
+    async def call_ai_model(model_name, prompt):
+        module.model_calls.append(model_name)
+        await asyncio.sleep(0.05)
+        return json.dumps({"score": 8, "reasoning": "ok", "details": []})
+
+    monkeypatch.setattr(module, 'call_ai_model', call_ai_model)
+    monkeypatch.setattr(module, 'extract_description_and_composition',
+                        lambda _soup: ("Витамин D3 для иммунитета.", "Холекальциферол; Масло"))
+    return module
+
+
+def request_line(request_id, method='analyze_product', params=None):
+    return json.dumps({"id": request_id, "method": method, "params": params or {"page_html": PAGE_HTML}})
+
+
+def test_concurrent_identical_requests_share_one_analysis(server):
+    async def run():
+        return await asyncio.gather(
+            server.server_loop.handle_message(request_line(1)),
+            server.server_loop.handle_message(request_line(2)),
+        )
+
+    first, second = [json.loads(line) for line in asyncio.run(run())]
+
+    # Один анализ делает два вызова модели: базовый и детальный
+    assert len(server.model_calls) == 2
+    assert first["id"] == 1 and second["id"] == 2
+    assert first["result"] == second["result"]
+    assert not server.inflight_calls
+
+
+def test_duplicate_after_cancel_starts_new_analysis(server):
+    async def run():
+        cancelled = asyncio.ensure_future(server.analyze_ozon_product({"page_html": PAGE_HTML}))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        # Отмена последнего ожидающего доходит до общей задачи, но та еще не завершилась
+        await asyncio.sleep(0)
+        # Повтор сразу после отмены не должен получить CancelledError отмененной задачи
+        result = await server.analyze_ozon_product({"page_html": PAGE_HTML})
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        return result
+
+    result = asyncio.run(run())
+    assert result["result"]["analysis"]["score"] == 8
+    assert not server.inflight_calls
+
+
+def test_marketing_filter_keeps_warnings_and_ingredients(server):
+    description = 'Витамин D3 для иммунитета. Возможны аллергические реакции. Акция! Скидки до 50%.'
+    assert server.compact_text(description) == 'Витамин D3 для иммунитета. Возможны аллергические реакции.'
+
+    context = server.PromptContext(description, 'Рыбий жир; Желатин; Глицерин; Фракция омега-3 кислот')
+    assert 'Фракция омега-3 кислот' in context.composition
+
+
+def test_texts_are_offloaded_only_on_request(server):
+    long_text = 'Подробное описание. ' * 100
+    response = {"result": {"description": long_text, "score": 8}}
+
+    assert server.shape_response(response, None, None) == response
+    shaped = server.shape_response(response, None, 100)["result"]
+    ref = shaped["description"]["$ref"]
+    assert server.get_result_text({"ref": ref, "offset": 20, "limit": 19})["result"]["text"] == long_text[20:39]
+
+
+@pytest.mark.parametrize("params", [
+    {"max_inline_chars": "много"},
+    {"max_inline_chars": float('nan')},
+    {"max_inline_chars": 1.5},
+    {"fields": 5},
+])
+def test_invalid_shape_params_are_rejected_before_analysis(server, params):
+    line = request_line(1, params=dict(params, page_html=PAGE_HTML))
+    response = json.loads(asyncio.run(server.server_loop.handle_message(line)))
+
+    assert response["error"]["code"] == -32602
+    assert not server.model_calls
+    assert server.server_loop.snapshot()["quarantined"] == 0
+    # Путь воркера: ошибка возвращается до запуска инструмента
+    assert server.shape_tool_options('analyze_product', params)["error"]["code"] == -32602
+
+
+def test_worker_shapes_result_with_parsed_options(server):
+    options = server.shape_tool_options('analyze_product', {"fields": "analysis.score", "max_inline_chars": 10})
+    response = {"result": {"analysis": {"score": 8, "summary": "длинный текст"}, "message": "ok"}}
+
+    assert server.shape_tool_result('analyze_product', response, options) == {"result": {"analysis": {"score": 8}}}
+    assert server.shape_tool_options('get_result_text', {"max_inline_chars": "много"}) == {}
+
+
+@pytest.mark.parametrize("params", [
+    {"ref": "x", "offset": "начало"},
+    {"ref": "x", "limit": float('inf')},
+    {"ref": ["x"]},
+])
+def test_invalid_result_text_params(server, params):
+    assert server.get_result_text(params)["error"]["code"] == -32602
@@ -0,0 +1,156 @@
+"""
+Тесты общего цикла MCP-серверов (python-host/server_loop.py).
+
+Запуск: python -m pytest tests/plugins
+"""
+
+import asyncio
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PYTHON_HOST_DIR = os.path.join(REPO_ROOT, 'python-host')
+
+
+def load_module(name):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(PYTHON_HOST_DIR, f'{name}.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def server_loop():
+    return load_module('server_loop')
+
+
+class Clock:
+    """Подменный time.monotonic для проверки истечения карантина"""
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def request_line(request_id, method='work', params=None):
+    return json.dumps({"id": request_id, "method": method, "params": params or {}})
+
+
+def test_plugin_copies_match_canonical_block():
+    completed = subprocess.run(
+        [sys.executable, os.path.join(PYTHON_HOST_DIR, 'sync_server_loop.py'), '--check'],
+        capture_output=True, text=True, encoding='utf-8'
+    )
+    assert completed.returncode == 0, completed.stdout
+
+
+def test_repeated_identical_failure_is_quarantined_until_ttl(server_loop, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(server_loop.time, 'monotonic', clock)
+    calls = []
+
+    async def process_request(request):
+        calls.append(request['id'])
+        raise ValueError("битые данные")
+
+    loop = server_loop.McpServerLoop(process_request, quarantine_ttl=60)
+
+    async def send(request_id):
+        return json.loads(await loop.handle_message(request_line(request_id)))
+
+    assert asyncio.run(send(1))["error"]["code"] == -32603
+    assert asyncio.run(send(2))["error"]["code"] == -32603
+    rejected = asyncio.run(send(3))
+    assert rejected["error"]["code"] == -32001 and rejected["id"] == 3
+    assert calls == [1, 2]
+
+    clock.now += 61
+    assert asyncio.run(send(4))["error"]["code"] == -32603
+    assert calls == [1, 2, 4]
+    stats = loop.snapshot()
+    assert stats["quarantine_size"] == 0
+    # Отказ карантином не считается предотвращенным падением
+    assert stats["cold_starts_avoided"] == 3 and stats["quarantine_hits"] == 1
+
+
+def test_malformed_messages_count_as_cold_starts_avoided(server_loop):
+    async def process_request(request):
+        return {"result": "ok"}
+
+    loop = server_loop.McpServerLoop(process_request)
+
+    async def run():
+        return [json.loads(await loop.handle_message(line))
+                for line in ('{"id": 1, "method"', '[1]', request_line(3))]
+
+    responses = asyncio.run(run())
+    assert [response.get("error", {}).get("code") for response in responses] == [-32700, -32600, None]
+    assert loop.snapshot()["cold_starts_avoided"] == 2
+
+
+def test_transient_failures_are_not_quarantined(server_loop):
+    attempts = []
+
+    async def process_request(request):
+        attempts.append(request['id'])
+        if len(attempts) % 2:
+            raise ConnectionError(f"сбой сети {len(attempts)}")
+        return {"result": "ok"}
+
+    loop = server_loop.McpServerLoop(process_request)
+
+    async def run():
+        return [json.loads(await loop.handle_message(request_line(i))) for i in range(4)]
+
+    responses = asyncio.run(run())
+    assert [("result" in response) for response in responses] == [False, True, False, True]
+    assert loop.snapshot()["quarantined"] == 0
+
+
+def test_timeout_is_not_retried_or_quarantined(server_loop):
+    started = []
+
+    async def process_request(request):
+        started.append(request['id'])
+        await asyncio.sleep(10)
+
+    loop = server_loop.McpServerLoop(process_request, timeout=0.01)
+
+    async def run():
+        return [json.loads(await loop.handle_message(request_line(i))) for i in range(3)]
+
+    responses = asyncio.run(run())
+    assert [response["error"]["code"] for response in responses] == [-32603] * 3
+    # Каждый запрос запущен ровно один раз
+    assert started == [0, 1, 2]
+    stats = loop.snapshot()
+    assert stats["timeouts"] == 3 and stats["quarantined"] == 0
+    assert stats["cold_starts_avoided"] == 0
+
+
+def test_stuck_handler_does_not_block_other_requests(server_loop):
+    async def process_request(request):
+        if request['method'] == 'stuck':
+            await asyncio.sleep(10)
+        return {"result": request['method']}
+
+    loop = server_loop.McpServerLoop(process_request, timeout=0.5)
+
+    async def run():
+        finished = []
+
+        async def send(line):
+            finished.append(json.loads(await loop.handle_message(line)))
+
+        await asyncio.gather(send(request_line(1, 'stuck')), send(request_line(2, 'ping')))
+        return finished
+
+    fast, stuck = asyncio.run(run())
+    assert fast == {"result": "ping", "id": 2}
+    assert stuck["error"]["code"] == -32603
@@ -0,0 +1,103 @@
+"""
+Тесты MCP-сервера time-test: таблицы переходов зон и параметры get_times.
+
+Запуск: python -m pytest tests/plugins
+"""
+
+import asyncio
+import importlib.util
+import os
+import random
+from datetime import datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SERVER_PATH = os.path.join(REPO_ROOT, 'chrome-extension', 'public', 'plugins', 'time-test', 'mcp_server.py')
+
+# Летнее время, получасовой сдвиг летнего времени, сдвиг на 2 часа и смена стороны линии перемены дат
+ZONES = ['Europe/Moscow', 'America/New_York', 'Australia/Lord_Howe', 'Antarctica/Troll', 'Pacific/Apia']
+
+
+@pytest.fixture
+def server():
+    spec = importlib.util.spec_from_file_location('time_test_server', SERVER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def assert_matches_zoneinfo(table, zone, timestamp):
+    local, offset, abbreviation, dst = table.convert(timestamp)
+    expected = datetime.fromtimestamp(timestamp, zone)
+    assert offset == int(expected.utcoffset().total_seconds()), (zone, timestamp)
+    assert abbreviation == expected.tzname(), (zone, timestamp)
+    assert dst == bool(expected.dst()), (zone, timestamp)
+    assert local.replace(tzinfo=None) == expected.replace(tzinfo=None), (zone, timestamp)
+
+
+@pytest.mark.parametrize('name', ZONES)
+def test_conversions_match_zoneinfo(server, name):
+    table = server.get_zone_table(name)
+    zone = ZoneInfo(name)
+    rng = random.Random(name)
+    # Внутри диапазона таблиц и за его пределами
+    for _ in range(2000):
+        assert_matches_zoneinfo(table, zone, rng.randint(-400_000_000, 2_500_000_000))
+
+
+@pytest.mark.parametrize('name', ZONES)
+def test_conversions_at_transitions_and_year_boundaries(server, name):
+    table = server.get_zone_table(name)
+    zone = ZoneInfo(name)
+    transitions = 0
+    for year_index in range(len(server.YEAR_STARTS) - 1):
+        starts, _periods = table.scan_year(year_index)
+        transitions += len(starts) - 1
+        for moment in starts + [server.YEAR_STARTS[year_index + 1]]:
+            for timestamp in (moment - 1, moment, moment + 1):
+                assert_matches_zoneinfo(table, zone, timestamp)
+    assert transitions > 0
+
+
+def test_year_tables_are_built_on_demand(server):
+    table = server.get_zone_table('Europe/Moscow')
+    asyncio.run(server.get_times({"timezones": ['Europe/Moscow'], "timestamps": ['2024-07-01T00:00:00Z']}))
+    assert len(table.years) == 1
+
+
+@pytest.mark.parametrize('params', [
+    {"timezones": "Europe/Moscow"},
+    {"timezones": ["Europe/Moscow", 3]},
+    {"timestamps": "1700000000"},
+    {"timestamps": [float('nan')]},
+    {"timestamps": [float('inf')]},
+    {"timestamps": [1e20]},
+    {"timestamps": ["вчера"]},
+])
+def test_get_times_rejects_invalid_params(server, params):
+    assert asyncio.run(server.get_times(params))["error"]["code"] == -32602
+
+
+def test_get_time_rejects_invalid_timezone(server):
+    assert asyncio.run(server.get_current_time({"timezone": ["Europe/Moscow"]}))["error"]["code"] == -32602
+    assert asyncio.run(server.get_current_time({"timezone": "Nowhere/Town"}))["error"]["code"] == -32602
+
+
+def test_unknown_zone_is_reported_per_zone(server):
+    result = asyncio.run(server.get_times({"timezones": ['Europe/Moscow', 'Nowhere/Town'], "timestamps": [0]}))
+    zones = result["result"]["timezones"]
+    assert zones['Europe/Moscow']["utc_offsets"] == ['+03:00']
+    assert "error" in zones['Nowhere/Town']
+
+
+def test_missing_tz_database_is_internal_error(server, monkeypatch):
+    def missing_zone(name):
+        raise ZoneInfoNotFoundError(f"No time zone found with key {name}")
+
+    monkeypatch.setattr(server, 'ZoneInfo', missing_zone)
+    server.get_zone_table.cache_clear()
+
+    assert asyncio.run(server.get_current_time({}))["error"]["code"] == -32603
+    assert asyncio.run(server.get_times({"timezones": ['Europe/Moscow']}))["error"]["code"] == -32603
@@ -1,5 +1,6 @@
 import { defineConfig } from 'vite';
 import { resolve } from 'path';
+import { execFileSync } from 'child_process';
 import { viteStaticCopy } from 'vite-plugin-static-copy';
 
 export default defineConfig({
@@ -27,6 +28,22 @@ export default defineConfig({
   },
 
   plugins: [
+    {
+      // plugins/registry.json for core/plugin-manager.js is regenerated on every build
+      name: 'build-plugin-registry',
+      buildStart() {
+        const python = process.env.PYTHON || 'python3';
+        try {
+          execFileSync(python, ['python-host/build_registry.py', '--plugins-dir', 'public/plugins'], { stdio: 'inherit' });
+        } catch (error) {
+          // Without Python the existing registry.json is shipped; an invalid manifest still fails the build
+          if (error.code !== 'ENOENT') {
+            throw error;
+          }
+          this.warn(`${python} not found, plugins/registry.json was not regenerated`);
+        }
+      }
+    },
     viteStaticCopy({
       targets: [
         {